@@ -0,0 +1,149 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+DEFAULT_DB = "assets/players/db.csv"
+
+def collect_images(inputs):
+    """
+    Expands directories and glob patterns into a sorted list of image files.
+    """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, names in os.walk(item):
+                files.extend(os.path.join(root, name) for name in names)
+        else:
+            files.extend(glob.glob(item, recursive=True))
+    files = [f for f in files if f.lower().endswith(IMAGE_EXTENSIONS)]
+    # Keep the order stable and drop duplicates from overlapping inputs
+    return sorted(set(files))
+
+def init_worker(threads, verbose, recognizer_only=False):
+    """
+    Runs once in each worker process: loads the OCR reader a single time
+    so every image handled by this worker reuses it (a forked worker already has the parent's).
+    """
+    if not verbose:
+        # The scanner prints a trace line per token, way too noisy for hundreds of files
+        sys.stdout = open(os.devnull, 'w')
+    else:
+        # Keep the trace out of the JSON Lines output, which may be stdout
+        sys.stdout = sys.stderr
+
+    from assets.package.detector import load_model
+    # Keep workers from fighting over cores (N workers x N torch threads)
+    load_model(threads, recognizer_only)
+
+def make_pool(workers, threads, verbose=False, recognizer_only=False, share=True):
+    """
+    Worker pool for scans. Where fork is available (Linux), the reader is loaded once here
+    and the workers inherit it: no per-worker load time, and the weights start out as pages
+    shared with the parent (see share_model for what is and isn't guaranteed to stay shared).
+    Elsewhere each worker loads its own.
+    """
+    context = None
+    if share and "fork" in multiprocessing.get_all_start_methods():
+        from assets.package.detector import load_model, share_model
+        share_model(load_model(recognizer_only=recognizer_only))
+        context = multiprocessing.get_context("fork")
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=context,
+        initializer=init_worker, initargs=(threads, verbose, recognizer_only)
+    )
+
+def scan_file(image_path, csv_path=DEFAULT_DB, use_layout=False, cache_dir=None, tile_workers=0, recognizer_only=False):
+    """
+    Scans one screenshot and returns a JSON Lines record.
+    Errors are caught and reported in the record so one bad image doesn't stop the batch.
+    """
+    from assets.package.detector import ExactTeamScanner
+    from assets.package.cache import get_result_cache
+
+    record = {"file": image_path}
+    start = time.perf_counter()
+    try:
+        scanner = ExactTeamScanner(csv_path, image_path, use_layout=use_layout, tile_workers=tile_workers, recognizer_only=recognizer_only)
+        # Re-running a batch over the same files only scans the new ones
+        cache = get_result_cache(cache_dir) if cache_dir else None
+
+        record["ok"] = True
+        record["result"] = scanner.scan_export(cache)
+        record["timings"] = {"total": round(time.perf_counter() - start, 4)}
+        # Per-stage breakdown from the scanner's metrics
+        # (nested ones as 'parent.stage', their time is already in the parent's)
+        metrics = scanner.metrics
+        record["timings"].update({metrics.stage_path(stage): round(seconds, 4) for stage, seconds in metrics.stages.items()})
+        record["counters"] = scanner.metrics.report()["counters"]
+    except Exception as e:
+        record["ok"] = False
+        record["error"] = f"{type(e).__name__}: {e}"
+        record["timings"] = {"total": round(time.perf_counter() - start, 4)}
+    return record
+
+def run_batch(images, output, csv_path=DEFAULT_DB, workers=None, verbose=False, use_layout=False, cache_dir=None, tile_workers=0, threads=None, recognizer_only=False, share=True):
+    """
+    Scans every image across a pool of worker processes and writes one JSON line per image.
+    Yields each record as soon as it's written.
+    """
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(images)))
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+
+    with make_pool(workers, threads, verbose, recognizer_only, share) as pool:
+        futures = {pool.submit(scan_file, image, csv_path, use_layout, cache_dir, tile_workers, recognizer_only): image for image in images}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                # Worker crashed (e.g. killed by OOM), still report the file
+                record = {"file": futures[future], "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+            yield record
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan many team screenshots into JSON Lines.")
+    parser.add_argument("inputs", nargs="+", help="Image files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="-", help="Output .jsonl file (default: stdout)")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Path to the player database CSV")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--layout", action="store_true", help="Only OCR the name plates and formation label of known screen layouts")
+    parser.add_argument("--cache-dir", default=None, help="Folder for the on-disk result cache")
+    parser.add_argument("--threads", type=int, default=None, help="Torch threads per worker (default: CPU count / workers)")
+    parser.add_argument("--recognizer-only", action="store_true", help="Skip the text detector and read the name plates of known screen layouts")
+    parser.add_argument("--no-share", action="store_true", help="Load the model in every worker instead of inheriting the parent's")
+    parser.add_argument("--tiles", type=int, default=0, help="Read big screenshots in overlapping tiles with this many threads per worker")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show the scanner trace from the workers")
+    args = parser.parse_args(argv)
+
+    images = collect_images(args.inputs)
+    if not images:
+        print("❌ No images found.", file=sys.stderr)
+        return 1
+
+    output = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    start = time.perf_counter()
+    failed = 0
+    try:
+        for record in run_batch(images, output, args.db, args.workers, args.verbose, args.layout, args.cache_dir, args.tiles, args.threads, args.recognizer_only, not args.no_share):
+            if not record["ok"]:
+                failed += 1
+                print(f"⚠️ {record['file']}: {record['error']}", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"🎉 Scanned {len(images)} images in {elapsed:.1f}s ({failed} failed)", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import cv2
+
+DEFAULT_TRUTH = "test_screenshots/ground_truth.json"
+DEFAULT_DB = "assets/players/db.csv"
+
+# Cold-start checks, each one runs in a fresh interpreter
+STARTUP_CHECKS = {
+    "import detector": "import assets.package.detector",
+    "import website": "import assets.package.website",
+    "catalogue + fuzzy index": f"from assets.package.catalogue import get_catalogue; get_catalogue({DEFAULT_DB!r})",
+    "import easyocr": "import easyocr",
+    "load model": "from assets.package.detector import load_model; load_model()",
+    "load model (recognizer only)": "from assets.package.detector import load_model; load_model(recognizer_only=True)",
+}
+HEAVY_MODULES = ["torch", "easyocr", "streamlit", "pandas", "cv2"]
+
+STAGES = ["decode", "preprocess", "ocr_detect", "ocr_recognize", "ocr", "match", "formation", "export"]
+
+def rotate(img, degrees):
+    height, width = img.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), degrees, 1.0)
+    return cv2.warpAffine(img, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE)
+
+def recompress(img, quality):
+    return cv2.imdecode(cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], cv2.IMREAD_COLOR)
+
+# Synthetic damage applied to the test screenshots, to measure what adaptive preprocessing gains
+DEGRADATIONS = {
+    "dark": lambda img: cv2.convertScaleAbs(img, alpha=0.35, beta=0),
+    "blur": lambda img: cv2.GaussianBlur(img, (0, 0), 2.5),
+    "skew": lambda img: rotate(img, 3),
+    "jpeg": lambda img: recompress(img, 25),
+}
+
+def current_rss():
+    """ Resident memory of the process in bytes, None where it can't be read (no psutil, no /proc) """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RSSSampler:
+    """
+    Peak resident memory over a stage, polled from a background thread.
+    Unlike tracemalloc it sees native allocations (torch / EasyOCR tensors, OpenCV buffers).
+    Allocations shorter than interval can be missed.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.base = self.peak = current_rss()
+        self.done = threading.Event()
+        self.thread = None
+        if self.base is not None:
+            self.thread = threading.Thread(target=self.poll, daemon=True)
+            self.thread.start()
+
+    def poll(self):
+        while not self.done.wait(self.interval):
+            self.peak = max(self.peak, current_rss() or 0)
+
+    def stop(self):
+        """ Growth of the peak over the start of the stage in MB, None if RSS can't be read """
+        if self.thread is None:
+            return None
+        self.done.set()
+        self.thread.join()
+        self.peak = max(self.peak, current_rss() or 0)
+        return (self.peak - self.base) / 2**20
+
+
+class StageRecorder:
+    """
+    Times each stage of one scan: wall time, CPU time (all threads of the process),
+    peak resident memory growth (native allocations included) and peak Python/NumPy heap
+    allocated during the stage (tracemalloc, which doesn't see torch's memory).
+    """
+    def __init__(self, track_memory=True):
+        self.track_memory = track_memory
+        self.stages = {}
+
+    def run(self, name, func, *args):
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            rss = RSSSampler()
+        wall, cpu = time.perf_counter(), time.process_time()
+
+        result = func(*args)
+
+        stage = {
+            "wall": time.perf_counter() - wall,
+            "cpu": time.process_time() - cpu
+        }
+        if self.track_memory:
+            rss_mb = rss.stop()
+            if rss_mb is not None:
+                stage["rss_mb"] = rss_mb
+            stage["heap_mb"] = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+        self.stages[name] = stage
+        return result
+
+def canonical(lookup, name):
+    """ Maps any known spelling (romaji or localised) to the name the exporter would write """
+    if name is None:
+        return "None"
+    player = lookup.get(name.lower())
+    return player.name if player else name
+
+def score(lookup, data, truth):
+    """ Compares one export_json payload against its ground truth """
+    expected = {canonical(lookup, name) for name in truth["players"]}
+    found = {canonical(lookup, name) for name in data["formation_structure"]} if data else set()
+    correct = len(expected & found)
+
+    return {
+        "players_expected": len(expected),
+        "players_found": len(found),
+        "players_correct": correct,
+        "player_recall": correct / len(expected) if expected else 1.0,
+        "player_precision": correct / len(found) if found else 0.0,
+        "coach_ok": canonical(lookup, data["coach"] if data else None) == canonical(lookup, truth["coach"]),
+        "formation_ok": bool(data) and data["formation_layout"] == truth["formation_layout"]
+    }
+
+def bench_image(scanner, recorder):
+    """ Runs the same steps as ExactTeamScanner.scan + export_json, one stage at a time """
+    gray = recorder.run("decode", scanner.decode_image)
+    img = recorder.run("preprocess", scanner.preprocess_image, gray)
+
+    if scanner.use_layout or scanner.tile_workers:
+        # Layout and tiled modes mix detection and recognition per region/tile
+        results = recorder.run("ocr", scanner.read_text, img)
+    else:
+        boxes = recorder.run("ocr_detect", scanner.detect_text, img)
+        results = recorder.run("ocr_recognize", scanner.recognize_text, img, boxes)
+
+    def match():
+        return scanner.match_tokens(scanner.sort_results(results))
+
+    players, found_formation = recorder.run("match", match)
+    formation = recorder.run("formation", scanner.detect_formation, *found_formation)
+    if not players:
+        return None
+    return recorder.run("export", scanner.export_json, players, formation)
+
+def summarize(records):
+    ok = [r for r in records if r["ok"]]
+    summary = {"images": len(records), "failed": len(records) - len(ok), "stages": {}}
+
+    for name in STAGES:
+        values = [r["stages"][name] for r in ok if name in r["stages"]]
+        if not values:
+            continue
+        summary["stages"][name] = {
+            key: sum(v[key] for v in values) / len(values)
+            for key in values[0]
+        }
+    if ok:
+        summary["wall_per_image"] = sum(r["wall"] for r in ok) / len(ok)
+        for key in ["player_recall", "player_precision"]:
+            summary[key] = sum(r["accuracy"][key] for r in ok) / len(ok)
+        for key in ["coach_ok", "formation_ok"]:
+            summary[key.replace("_ok", "_accuracy")] = sum(r["accuracy"][key] for r in ok) / len(ok)
+    summary["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return summary
+
+def run_bench(truth_path=DEFAULT_TRUTH, csv_path=DEFAULT_DB, use_layout=False, repeat=1, track_memory=True, tile_workers=0, adaptive=True, degrade=None):
+    """
+    adaptive=False runs the original fixed preprocessing (no quality check), degrade names a
+    DEGRADATIONS entry applied to every screenshot first.
+    """
+    from assets.package.detector import ExactTeamScanner, load_model
+    from assets.package.catalogue import get_catalogue
+
+    with open(truth_path, encoding="utf-8") as f:
+        truth = json.load(f)
+    folder = os.path.dirname(truth_path)
+    lookup = get_catalogue(csv_path).lookup
+
+    start = time.perf_counter()
+    load_model()
+    model_time = time.perf_counter() - start
+
+    if track_memory:
+        tracemalloc.start()
+
+    records = []
+    for name, expected in truth.items():
+        for run in range(repeat):
+            record = {"file": name, "run": run}
+            recorder = StageRecorder(track_memory)
+            start = time.perf_counter()
+            scanner = None
+            try:
+                image = os.path.join(folder, name)
+                if degrade:
+                    image = DEGRADATIONS[degrade](cv2.imread(image, cv2.IMREAD_COLOR))
+                scanner = ExactTeamScanner(csv_path, image, use_layout=use_layout, tile_workers=tile_workers)
+                scanner.adaptive_preprocess = scanner.quality_gate = adaptive
+                # Keep the scanner's log out of the console
+                scanner.set_callback(lambda events: None)
+                data = bench_image(scanner, recorder)
+                record["ok"] = True
+                record["accuracy"] = score(lookup, data, expected)
+                record["result"] = data
+                # Match counters and fuzzy query latency from the scanner's own metrics
+                report = scanner.metrics.report()
+                record["counters"] = report["counters"]
+                record["fuzzy_queries"] = report["fuzzy_queries"]
+                record["fuzzy_batch"] = report["fuzzy_batch"]
+            except Exception as e:
+                record["ok"] = False
+                record["error"] = f"{type(e).__name__}: {e}"
+            record["wall"] = time.perf_counter() - start
+            record["stages"] = recorder.stages
+            record["preprocess"] = scanner.preprocess_applied if scanner else []
+            record["quality"] = scanner.quality.to_dict() if scanner and scanner.quality else None
+            records.append(record)
+
+    if track_memory:
+        tracemalloc.stop()
+
+    summary = summarize(records)
+    summary["model_load"] = model_time
+    summary["use_layout"] = use_layout
+    summary["tile_workers"] = tile_workers
+    summary["preprocess"] = "adaptive" if adaptive else "fixed"
+    summary["degrade"] = degrade
+    return {"summary": summary, "images": records}
+
+def startup_times(repeat=3):
+    """
+    Times each STARTUP_CHECKS snippet in a new Python process (minus the bare interpreter start)
+    and lists which heavy modules it pulled in.
+    """
+    def run(code):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if out.returncode != 0:
+            raise RuntimeError(out.stderr.strip().splitlines()[-1])
+        return elapsed, out.stdout
+
+    baseline = min(run("pass")[0] for _ in range(repeat))
+    probe = f"\nimport sys; print('modules:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+
+    results = {}
+    for name, code in STARTUP_CHECKS.items():
+        try:
+            runs = [run(code + probe) for _ in range(repeat)]
+        except RuntimeError as e:
+            results[name] = {"error": str(e)}
+            continue
+        results[name] = {
+            "seconds": min(elapsed for elapsed, _ in runs) - baseline,
+            "modules": [m for m in runs[0][1].rsplit("modules:", 1)[-1].strip().split(",") if m]
+        }
+    return results
+
+def print_startup(results):
+    print(f"{'startup check':<26}{'seconds':>9}  heavy modules loaded")
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:<26}{'-':>9}  ❌ {result['error']}")
+        else:
+            print(f"{name:<26}{result['seconds']:>9.2f}  {', '.join(result['modules']) or '-'}")
+
+def print_report(report):
+    summary = report["summary"]
+    # RSS MB: peak resident memory growth (torch included), heap MB: Python/NumPy allocations only
+    print(f"{'stage':<15}{'wall ms':>10}{'cpu ms':>10}{'RSS MB':>10}{'heap MB':>10}")
+    for name, stage in summary["stages"].items():
+        memory = "".join(f"{stage[key]:>10.1f}" if key in stage else f"{'-':>10}" for key in ("rss_mb", "heap_mb"))
+        print(f"{name:<15}{stage['wall'] * 1000:>10.1f}{stage['cpu'] * 1000:>10.1f}{memory}")
+
+    for record in report["images"]:
+        if not record["ok"]:
+            print(f"❌ {record['file']}: {record['error']}")
+            continue
+        acc = record["accuracy"]
+        flags = ("✅" if acc["coach_ok"] else "❌") + ("✅" if acc["formation_ok"] else "❌")
+        print(f"{record['file']:<25}{record['wall']:>7.2f}s  players {acc['players_correct']}/{acc['players_expected']}  coach/formation {flags}  [{', '.join(record['preprocess'])}]")
+
+    if "wall_per_image" in summary:
+        print(f"\nPer image: {summary['wall_per_image']:.2f}s | players recall {summary['player_recall']:.1%}"
+              f" precision {summary['player_precision']:.1%} | coach {summary['coach_accuracy']:.1%}"
+              f" | formation {summary['formation_accuracy']:.1%}")
+    print(f"Model load: {summary['model_load']:.2f}s | max RSS: {summary['max_rss_mb']:.0f} MB"
+          f" | preprocessing: {summary['preprocess']}" + (f" on {summary['degrade']} images" if summary["degrade"] else ""))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scan speed and accuracy on the test screenshots.")
+    parser.add_argument("--truth", default=DEFAULT_TRUTH, help="Ground truth JSON (image paths are relative to it)")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Path to the player database CSV")
+    parser.add_argument("--layout", action="store_true", help="Benchmark the layout-aware OCR mode")
+    parser.add_argument("--tiles", type=int, default=0, help="Benchmark tiled OCR with this many threads")
+    parser.add_argument("--repeat", type=int, default=1, help="Scans per image")
+    parser.add_argument("--fixed-preprocess", action="store_true", help="Use the original fixed contrast shift instead of the adaptive pipeline")
+    parser.add_argument("--degrade", choices=sorted(DEGRADATIONS), default=None, help="Damage every screenshot first (compare --fixed-preprocess runs on it)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the memory columns (tracemalloc slows down the match stage)")
+    parser.add_argument("--startup", action="store_true", help="Only measure cold-start import/model load times")
+    parser.add_argument("-o", "--output", default=None, help="Write the full results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        results = startup_times(args.repeat if args.repeat > 1 else 3)
+        print_startup(results)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=4)
+        return 0
+
+    report = run_bench(args.truth, args.db, args.layout, args.repeat, not args.no_memory, args.tiles, not args.fixed_preprocess, args.degrade)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    return 1 if report["summary"]["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from assets.package.near_dupes import NearDuplicateIndex
+
+class ResultCache:
+    """
+    Caches finished scan results by a hash of the image bytes + the scanner settings.
+    Two tiers: an in-memory LRU, and an optional folder of JSON files capped by total size.
+    The in-memory entries can also be found by a near-duplicate of their screenshot
+    (near_distance = max dHash bits apart, 0 turns it off).
+    """
+    def __init__(self, max_entries=256, disk_dir=None, disk_max_bytes=64 * 1024 * 1024, near_distance=4):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "near_hits": 0}
+        self.near = NearDuplicateIndex(near_distance) if near_distance else None
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image_bytes, settings):
+        """ settings is the scanner fingerprint (DB version, threshold, preprocessing...) """
+        digest = hashlib.sha256(image_bytes)
+        digest.update(b"\0" + settings.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """ Returns the cached entry, or None on a miss """
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return self.memory[key]
+
+        value = self.read_disk(key)
+        with self.lock:
+            if value is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["disk_hits"] += 1
+            self.remember(key, value)
+        return value
+
+    def put(self, key, value, image=None, settings=None):
+        """ With the preprocessed image and the settings fingerprint, near-duplicates of it will find this entry too """
+        if image is not None and self.near is not None:
+            self.near.add(key, settings, image)
+        with self.lock:
+            self.remember(key, value)
+        self.write_disk(key, value)
+
+    def get_similar(self, image, settings):
+        """ Returns the entry of a verified near-duplicate screenshot scanned with the same settings, or None """
+        if self.near is None:
+            return None
+        key = self.near.find(settings, image)
+        if key is None:
+            return None
+        with self.lock:
+            value = self.memory.get(key)
+            if value is None:
+                return None
+            self.memory.move_to_end(key)
+            self.counters["near_hits"] += 1
+            return value
+
+    def remember(self, key, value):
+        # Caller holds the lock
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            evicted, _ = self.memory.popitem(last=False)
+            if self.near is not None:
+                self.near.discard(evicted)
+
+    def disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self.disk_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            # Touch the file so eviction drops the least recently used ones first
+            os.utime(path)
+            return value
+        except (OSError, ValueError):
+            return None
+
+    def write_disk(self, key, value):
+        if not self.disk_dir:
+            return
+        path = self.disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        self.evict_disk()
+
+    def evict_disk(self):
+        """ Deletes the oldest files until the folder fits in disk_max_bytes """
+        files = []
+        total = 0
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".json"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"] + stats["near_hits"]
+            stats["entries"] = len(self.memory)
+        return stats
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.near is not None:
+                self.near = NearDuplicateIndex(self.near.max_distance, self.near.max_difference)
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache(disk_dir=None):
+    """ Returns the process-wide result cache, created on first use """
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache(disk_dir=disk_dir)
+        return _result_cache
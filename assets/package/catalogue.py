@@ -0,0 +1,350 @@
+import argparse
+import csv
+import io
+import os
+import pickle
+import sys
+import threading
+from types import MappingProxyType
+from assets.package.fuzzy import FuzzyIndex, LayeredFuzzyIndex
+
+SNAPSHOT_VERSION = 1
+# Name changes kept on top of the full indexes before they're rebuilt from scratch
+COMPACT_AFTER = 500
+DELTA_OPS = ("add", "update", "remove")
+
+class PlayerRecord:
+    """
+    One player row. Uses __slots__ so 5k players don't each carry a dict,
+    but still supports player['name'] like the old per-row dicts did.
+    """
+    __slots__ = ('id', 'name', 'name_localised', 'position', 'element', 'stats')
+
+    def __init__(self, id, name, name_localised, position, element, stats):
+        self.id = id
+        self.name = name
+        self.name_localised = name_localised
+        self.position = position
+        self.element = element
+        self.stats = stats
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __repr__(self):
+        return f"PlayerRecord({self.id}, {self.name!r})"
+
+    def as_tuple(self):
+        return tuple(getattr(self, field) for field in self.__slots__)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class PlayerCatalogue:
+    """
+    Immutable, process-wide view of db.csv: the exact-name lookup plus the fuzzy index.
+    Build it with get_catalogue() so every scanner shares the same one.
+    Database updates (see apply) make a new catalogue that reuses the indexes of this one,
+    scans that already hold the old one keep a consistent view until they finish.
+    """
+    def __init__(self, records, mtime_ns=None, csv_path=None, base=None, changes=0, delta_offset=0):
+        self.records = tuple(records)
+        self.mtime_ns = mtime_ns
+        self.csv_path = csv_path
+        # Delta log changes applied on top of db.csv, and how far the log was read (bytes)
+        self.changes = changes
+        self.delta_offset = delta_offset
+        # Identifies the exact data a scan was matched against: db.csv digest + applied changes
+        self.source_id = base.source_id if base is not None else self.csv_id(csv_path)
+        self.version = f"{self.source_id}+{changes}"
+
+        lookup = {}
+        for player in self.records:
+            # Add Exact Names to the dictionnary
+            lookup[player.name.lower()] = player
+            lookup[player.name_localised.lower()] = player
+
+        self.lookup = MappingProxyType(lookup)
+        self.names = tuple(lookup.keys())
+
+        # The catalogue that owns full indexes (maybe this one), and the names added / removed since
+        self.root = base.root if base is not None else None
+        self.added, self.removed = (), frozenset()
+        if self.root is not None:
+            root_names = set(self.root.names)
+            self.added = tuple(name for name in self.names if name not in root_names)
+            self.removed = frozenset(root_names.difference(self.names))
+            if len(self.added) + len(self.removed) > COMPACT_AFTER:
+                self.root = None
+        if self.root is None:
+            self.root = self
+            self.added, self.removed = (), frozenset()
+            self.fuzzy_index = FuzzyIndex(self.names)
+        else:
+            self.fuzzy_index = LayeredFuzzyIndex(self.root.fuzzy_index, self.added, self.removed)
+        self._vector_matcher = None
+        self._variants = None
+
+    @staticmethod
+    def csv_id(csv_path):
+        if csv_path is None:
+            return "local"
+        from assets.package.variants import csv_digest
+        return csv_digest(csv_path)[:12]
+
+    @property
+    def vector_matcher(self):
+        """ Batch matcher, built on first use so the catalogue itself doesn't need NumPy """
+        if self._vector_matcher is None:
+            if self.root is self:
+                from assets.package.vector_match import VectorMatcher
+                self._vector_matcher = VectorMatcher(self.names)
+            else:
+                from assets.package.vector_match import LayeredVectorMatcher
+                self._vector_matcher = LayeredVectorMatcher(self.root.vector_matcher, self.added, self.removed)
+        return self._vector_matcher
+
+    @property
+    def variants(self):
+        """
+        Normalized spelling -> exact lookup name (see variants.py).
+        Read from the table built next to the CSV when it's up to date, otherwise built in memory.
+        After an update, the root's table is copied and patched with the name changes.
+        """
+        if self._variants is None:
+            from assets.package import variants
+            if self.root is not self:
+                table = variants.patch_variants(dict(self.root.variants), self.lookup, self.added, self.removed)
+            else:
+                table = None
+                if self.csv_path is not None:
+                    table = variants.read_table(variants.default_path(self.csv_path), variants.csv_digest(self.csv_path))
+                if table is None:
+                    table, _ = variants.build_variants(self.lookup)
+            self._variants = MappingProxyType(table)
+        return self._variants
+
+    def apply(self, changes, delta_offset=None):
+        """
+        Returns a new catalogue with changes applied, a list of (op, PlayerRecord):
+        add / update put the record in (by ID), remove drops the ID.
+        The name indexes are layered over this catalogue's instead of being rebuilt.
+        """
+        records = {player.id: player for player in self.records}
+        for op, player in changes:
+            if op == "remove":
+                records.pop(player.id, None)
+            else:
+                records[player.id] = player
+        return PlayerCatalogue(
+            records.values(), self.mtime_ns, self.csv_path, base=self,
+            changes=self.changes + len(changes),
+            delta_offset=self.delta_offset if delta_offset is None else delta_offset
+        )
+
+    def variant(self, text):
+        """ O(1) lookup of an OCR read that differs from a name only by spacing, accents, order or look-alikes """
+        from assets.package.variants import normalize
+        name = self.variants.get(normalize(text))
+        return self.lookup[name] if name is not None else None
+
+    @staticmethod
+    def record_from_row(row):
+        """ One db.csv row (as a csv.DictReader dict) to a PlayerRecord """
+        stats = row['Total Stats'].strip()
+        return PlayerRecord(
+            int(row['ID']),
+            row['Name(Romaji)'].strip(),
+            row['Name(Localised)'].strip(),
+            row['Position'].strip() or None,
+            row['Element'].strip() or None,
+            int(float(stats)) if stats else None
+        )
+
+    @classmethod
+    def read_csv(cls, csv_path):
+        """ Parses db.csv with the csv module, no pandas needed """
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            return [cls.record_from_row(row) for row in csv.DictReader(f)]
+
+    @classmethod
+    def read_delta(cls, delta_path, offset=0):
+        """
+        Reads the delta log from offset (bytes): db.csv columns plus an 'op' column (add / update / remove,
+        a remove only needs the ID). Returns ([(op, PlayerRecord)], new offset).
+        Only whole lines are read, a line that's still being appended is picked up next time.
+        """
+        with open(delta_path, 'rb') as f:
+            header = f.readline()
+            if not header.endswith(b"\n"):
+                return [], 0
+            start = max(offset, f.tell())
+            f.seek(start)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+
+        changes = []
+        rows = csv.DictReader(io.StringIO((header + data[:end]).decode('utf-8-sig'), newline=''))
+        for row in rows:
+            op = (row.get('op') or '').strip().lower()
+            if op not in DELTA_OPS or not (row.get('ID') or '').strip():
+                # Malformed lines are skipped rather than breaking every scan
+                continue
+            if op == "remove":
+                changes.append((op, PlayerRecord(int(row['ID']), "", "", None, None, None)))
+            else:
+                changes.append((op, cls.record_from_row(row)))
+        return changes, start + end
+
+    @classmethod
+    def load(cls, csv_path, snapshot_path=None):
+        """
+        Loads the catalogue, going through the binary snapshot when it's up to date.
+        The snapshot is rewritten whenever the CSV changes (if the folder is writable).
+        """
+        if not os.path.exists(csv_path):
+            raise FileNotFoundError(f"CSV file not found: {csv_path}")
+
+        stat = os.stat(csv_path)
+        if snapshot_path is None:
+            snapshot_path = csv_path + ".pkl"
+
+        records = cls.read_snapshot(snapshot_path, stat)
+        if records is None:
+            records = cls.read_csv(csv_path)
+            cls.write_snapshot(snapshot_path, stat, records)
+
+        catalogue = cls(records, mtime_ns=stat.st_mtime_ns, csv_path=csv_path)
+
+        # Changes logged since db.csv was last replaced
+        delta = delta_path(csv_path)
+        if os.path.exists(delta):
+            changes, offset = cls.read_delta(delta)
+            catalogue = catalogue.apply(changes, offset)
+        return catalogue
+
+    @staticmethod
+    def read_snapshot(snapshot_path, stat):
+        try:
+            with open(snapshot_path, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        # Only trust the snapshot if it was made from this exact CSV
+        if data.get('version') != SNAPSHOT_VERSION:
+            return None
+        if data.get('mtime_ns') != stat.st_mtime_ns or data.get('size') != stat.st_size:
+            return None
+        return [PlayerRecord(*row) for row in data['rows']]
+
+    @staticmethod
+    def write_snapshot(snapshot_path, stat, records):
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'rows': [player.as_tuple() for player in records]
+        }
+        tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, snapshot_path)
+        except OSError:
+            # Read-only deployments just skip the snapshot
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+
+def delta_path(csv_path):
+    """ The append-only change log next to the CSV: db.csv -> db.delta.csv """
+    return os.path.splitext(csv_path)[0] + ".delta.csv"
+
+def delta_size(csv_path):
+    try:
+        return os.stat(delta_path(csv_path)).st_size
+    except OSError:
+        return 0
+
+def append_changes(csv_path, changes):
+    """
+    Appends (op, row dict with db.csv columns) changes to the delta log, creating it with its header.
+    Running processes pick them up on their next get_catalogue call, no restart needed.
+    """
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        columns = ['op'] + next(csv.reader(f))
+    path = delta_path(csv_path)
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    # Written in one call so readers never see half the batch
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator="\n", extrasaction='ignore')
+    if new_file:
+        writer.writeheader()
+    for op, row in changes:
+        if op not in DELTA_OPS:
+            raise ValueError(f"Unknown change '{op}', expected one of {', '.join(DELTA_OPS)}")
+        writer.writerow(dict(row, op=op))
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        f.write(buffer.getvalue())
+
+
+_catalogues = {}
+_catalogues_lock = threading.Lock()
+
+def get_catalogue(csv_path):
+    """
+    Returns the shared catalogue for csv_path.
+    It's loaded once per process and only rebuilt when the CSV's mtime changes. Lines appended
+    to the delta log are applied on top of the current one (a new catalogue, swapped in atomically).
+    """
+    key = os.path.abspath(csv_path)
+    if not os.path.exists(key):
+        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    mtime_ns = os.stat(key).st_mtime_ns
+    logged = delta_size(key)
+
+    catalogue = _catalogues.get(key)
+    if catalogue is not None and catalogue.mtime_ns == mtime_ns and catalogue.delta_offset == logged:
+        return catalogue
+
+    with _catalogues_lock:
+        # Another thread may have reloaded it while we waited
+        catalogue = _catalogues.get(key)
+        if catalogue is None or catalogue.mtime_ns != mtime_ns or logged < catalogue.delta_offset:
+            # New db.csv, or the log was rewritten instead of appended to: start over
+            catalogue = PlayerCatalogue.load(key)
+        elif logged > catalogue.delta_offset:
+            changes, offset = PlayerCatalogue.read_delta(delta_path(key), catalogue.delta_offset)
+            if changes:
+                catalogue = catalogue.apply(changes, offset)
+            else:
+                # Only malformed lines: nothing changes but the read position, don't read them again next call
+                catalogue.delta_offset = offset
+        _catalogues[key] = catalogue
+        return catalogue
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append changes to the player database's delta log (picked up without a restart).")
+    parser.add_argument("op", choices=DELTA_OPS, help="add / update: rows from a CSV with the db.csv columns, remove: player IDs")
+    parser.add_argument("items", nargs="+", help="CSV files (add, update) or IDs (remove)")
+    parser.add_argument("--db", default="assets/players/db.csv", help="Path to the player database CSV")
+    args = parser.parse_args(argv)
+
+    if args.op == "remove":
+        changes = [("remove", {"ID": int(player_id)}) for player_id in args.items]
+    else:
+        changes = []
+        for path in args.items:
+            with open(path, newline='', encoding='utf-8') as f:
+                changes.extend((args.op, row) for row in csv.DictReader(f))
+    append_changes(args.db, changes)
+    print(f"✅ {len(changes)} change(s) appended to {delta_path(args.db)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
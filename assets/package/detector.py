@@ -1,245 +1,634 @@
-import easyocr
-import pandas as pd
 import json
 import os
 import cv2
-import re
+import numpy as np
+import sys
 import time
-import streamlit as st
+import threading
 import difflib
+from assets.package.catalogue import get_catalogue
+from assets.package.layout import find_profile, find_profile_size, read_regions, read_slots
+from assets.package.spatial import reading_order, box_center, place_team
+from assets.package.tiles import read_tiles, shift_result
+from assets.package.progress import ProgressChannel
+from assets.package.tokens import TokenStream, clean_token, formation_code
+from assets.package.events import PlayerMatched, FormationDetected, CoachInferred, ScanComplete
+from assets.package.image_source import read_source, decode_gray, to_gray
+from assets.package.metrics import ScanMetrics, metrics_registry
+from assets.package.preprocess import measure_quality, check_quality, choose_stages, run_stages
 
-@st.cache_resource
-def load_model():
+_reader = None
+_reader_has_detector = False
+_reader_lock = threading.Lock()
+
+def load_model(threads=None, recognizer_only=False):
     """
     Loads EasyOCR from the local 'assets/models' folder.
-    This runs only once per session, preventing memory crashes.
+    This runs only once per process, preventing memory crashes.
+    easyocr (and torch) are only imported here, so importing this module stays cheap.
+    threads sets torch.set_num_threads, recognizer_only skips the text detection model
+    (a recognizer-only reader is rebuilt if a later caller needs detection).
+    """
+    global _reader, _reader_has_detector
+    with _reader_lock:
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        if _reader is None or (not recognizer_only and not _reader_has_detector):
+            import easyocr
+            # stderr: batch.py loads it in the parent, whose stdout may be the JSON Lines output
+            print("🧠 Loading AI models from disk...", file=sys.stderr)
+            _reader = easyocr.Reader(
+                ['en'], 
+                gpu=False, 
+                # CRITICAL: Point to your uploaded folder
+                model_storage_directory='assets/models', 
+                # CRITICAL: Stop it from trying to download anything
+                download_enabled=False,
+                # Optional: Helps stability on free cloud tier
+                quantize=True,
+                detector=not recognizer_only
+            )
+            _reader_has_detector = not recognizer_only
+        return _reader
+
+def share_model(reader=None):
+    """
+    Prepares the loaded reader to be inherited by forked workers: inference mode, no gradients,
+    and the float parameters and buffers moved to shared memory.
+    share_memory() doesn't reach the packed weights of the quantized layers (quantize=True), those
+    are only shared copy-on-write, as long as nothing writes to their pages. How much each worker
+    really shares hasn't been measured: compare the workers' PSS (/proc/<pid>/smaps_rollup) with
+    and without --no-share before counting on it.
+    Call it in the parent before the pool forks, and don't run inference in the parent.
     """
-    print("🧠 Loading AI models from disk...")
-    return easyocr.Reader(
-        ['en'], 
-        gpu=False, 
-        # CRITICAL: Point to your uploaded folder
-        model_storage_directory='assets/models', 
-        # CRITICAL: Stop it from trying to download anything
-        download_enabled=False,
-        # Optional: Helps stability on free cloud tier
-        quantize=True
-    )
+    reader = reader or load_model()
+    for module in (getattr(reader, 'detector', None), getattr(reader, 'recognizer', None)):
+        if module is None:
+            continue
+        module.eval()
+        for param in module.parameters():
+            param.requires_grad_(False)
+        module.share_memory()
+    return reader
+
+# Index = formation id used by detect_formation and the layout slot templates
+FORMATIONS = ["4-4-2 Diamond", "4-4-2 Box", "3-5-2 Freedom", "4-3-3 Triangle", "4-3-3 Delta", "4-5-1 Balanced", "3-6-1 Hexa", "5-4-1 Double Volante"]
 
 class ExactTeamScanner:
-    def __init__(self, csv_path, image_path):
+    # Matching / preprocessing settings (also part of the result cache key)
+    fuzzy_threshold = 0.85
+    # Candidates kept per OCR token by the batch matcher
+    top_k = 5
+    # scan_events stops reading tokens once it has this many players and a formation (11 + coach)
+    stop_after = 12
+    max_width = 1920
+    contrast_alpha = 1
+    contrast_beta = -50
+    # Preprocessing stages are picked per image from a quick quality check (see preprocess.py),
+    # a list of stage names in preprocess_stages forces them instead
+    adaptive_preprocess = True
+    preprocess_stages = None
+    # Rejects blank or hopelessly blurred uploads before the OCR runs
+    quality_gate = True
+    # Tiled OCR: big frames are kept up to tile_max_width and read in overlapping tiles
+    tile_max_width = 3840
+    tile_size = 1280
+    # In max_width coordinates like the boxes (wider than any name plate there), scaled up with the frame
+    tile_overlap = 256
+
+    def __init__(self, csv_path, image, use_layout=False, verbose=False, metrics=None, tile_workers=0, recognizer_only=False):
         self.csv_path = csv_path
-        self.image_path = image_path
-        
-        self.reader = load_model()
+        # Path, raw bytes, file-like object (e.g. a Streamlit upload) or an already decoded array
+        self.image = image
+        self.image_path = image if isinstance(image, (str, os.PathLike)) else None
+        self.image_data = None
+        # The OCR model is only loaded when the first OCR call needs it
+        self._reader = None
+        # If True, only OCR the name plates / formation label of known screen layouts
+        self.use_layout = use_layout
+        # Known screens only: read the name plates at the slot positions without the text detector
+        self.recognizer_only = recognizer_only
+        # Threads reading tiles in parallel, 0 = whole frame in one call
+        self.tile_workers = tile_workers
+        # Frame coordinates -> max_width coordinates (the OCR boxes are all in that space)
+        self.coord_scale = 1.0
+        # (width, height) of the frame the OCR boxes refer to, set by preprocess_image
+        self.frame_size = None
+        # Quality measurements and preprocessing stages of the last preprocess_image call
+        self.quality = None
+        self.preprocess_applied = []
         
-        self.db = self.load_database()
+        # Shared across every scanner in the process, only reloaded when db.csv changes
+        self.catalogue = get_catalogue(self.csv_path)
+        self.db = self.catalogue.lookup
         
         # Create a list of all valid names for comparison
-        self.all_names = list(self.db.keys())
+        self.all_names = self.catalogue.names
+        # Prebuilt index so fuzzy lookups don't scan every name
+        self.fuzzy_index = self.catalogue.fuzzy_index
         
-        self.callback = None  # Holder for the website function
+        # Per-token tracing is only recorded when verbose is on
+        self.verbose = verbose
+        self.progress = ProgressChannel(level=self.progress_level())
+        
+        # Stage timings and match counters, pass your own object to plug in other collectors
+        self.metrics = metrics if metrics is not None else ScanMetrics()
+        
+        # Top-k (name, score) per OCR string from the batch matcher, and the score of each found player
+        self.fuzzy_candidates = {}
+        self.confidence = {}
+        # Where each found player's name was read (frame fractions), and the formation label if one was read
+        self.positions = {}
+        self.formation_text = None
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = load_model(recognizer_only=self.recognizer_only)
+        return self._reader
 
     # If called, then it's running from the website
-    def set_callback(self, func):
-        self.callback = func
+    # func receives the list of buffered events, at most once every flush_interval seconds
+    def set_callback(self, func, flush_interval=0.25):
+        self.progress = ProgressChannel(func, level=self.progress_level(), flush_interval=flush_interval)
+
+    def progress_level(self):
+        return "debug" if self.verbose else "info"
             
     # Custom log function
-    def log(self, message):
-        if self.callback:
-            self.callback(message) # Send to website UI
-            time.sleep(0.02)
-        else:
-            print(message) # Send to console
+    def log(self, message, level="info"):
+        self.progress.emit(message, level)
         
     def load_database(self):
         """
-        Loads the CSV and creates a lookup for Full Names and Flipped Names.
+        Returns the lookup for Full Names and Flipped Names from the shared catalogue.
         """
-        if not os.path.exists(self.csv_path):
-            raise FileNotFoundError(f"CSV file not found: {self.csv_path}")
-            
-        df = pd.read_csv(self.csv_path)
-        lookup = {}
-        
-        for _, row in df.iterrows():
-            romaji = str(row['Name(Romaji)']).strip()
-            local = str(row['Name(Localised)']).strip()
-            
-            player_data = {
-                'id': int(row['ID']),
-                'name': romaji,            
-                'name_localised': local,
-                'position': row['Position'],
-                'element': row['Element'],
-                'stats': row['Total Stats']
-            }
-            
-            # Add Exact Names to the dictionnary
-            lookup[romaji.lower()] = player_data
-            lookup[local.lower()] = player_data
-
-        return lookup
+        return get_catalogue(self.csv_path).lookup
     
     # Add the fuzzy matching helper function
-    def find_fuzzy_match(self, text, threshold=0.85):
+    def find_fuzzy_match(self, text, threshold=None):
         """
         Returns the player data if a name in the DB is >85% similar to text.
         """
-        # get_close_matches returns a list of the best matches
-        matches = difflib.get_close_matches(text, self.all_names, n=1, cutoff=threshold)
+        return self.fuzzy_lookup(text, threshold)[0]
+
+    def fuzzy_lookup(self, text, threshold=None):
+        """
+        Returns (player data, similarity) for the best name >= threshold, (None, 0.0) otherwise.
+        Uses the batch matcher results when the token was scored up front.
+        """
+        if threshold is None:
+            threshold = self.fuzzy_threshold
+        
+        if threshold == self.fuzzy_threshold and text in self.fuzzy_candidates:
+            self.metrics.count("fuzzy_batched")
+            candidates = self.fuzzy_candidates[text]
+            if candidates:
+                name, score = candidates[0]
+                return self.db[name], score
+            return None, 0.0
+        
+        # Same result as difflib.get_close_matches on all_names, but only compares likely candidates
+        start = time.perf_counter()
+        matches = self.fuzzy_index.get_close_matches(text, n=1, cutoff=threshold)
+        self.metrics.observe_fuzzy(time.perf_counter() - start)
         if matches:
             best_match_key = matches[0]
-            return self.db[best_match_key]
-        return None
+            score = difflib.SequenceMatcher(None, best_match_key, text).ratio()
+            return self.db[best_match_key], score
+        return None, 0.0
+
+    def score_tokens(self, stream):
+        """
+        Scores every token and every adjacent pair of the image against the whole catalogue
+        in one vectorized pass, instead of one fuzzy search per lookup in the loop.
+        """
+        # Exact hits never need fuzzy scores
+        queries = list(dict.fromkeys(
+            q for q in stream.queries()
+            if q and q not in self.db and self.catalogue.variant(q) is None
+        ))
+        if not queries:
+            return
+        
+        start = time.perf_counter()
+        results = self.catalogue.vector_matcher.top_k(queries, k=self.top_k, cutoff=self.fuzzy_threshold)
+        # Kept apart from the per-query latency, one observation covers every query here
+        self.metrics.observe_fuzzy_batch(len(queries), time.perf_counter() - start)
+        self.fuzzy_candidates.update(zip(queries, results))
 
-    def preprocess_image(self):
+    def load_image(self):
+        """
+        Returns the encoded bytes of the image (or the array if it was given decoded).
+        Read only once, the cache key and the decoder both use it.
+        """
+        if self.image_data is None:
+            self.image_data = read_source(self.image)
+        return self.image_data
+
+    def decode_image(self):
+        """ Returns the grayscale image """
+        data = self.load_image()
+        if isinstance(data, np.ndarray):
+            return to_gray(data)
+        try:
+            # Decodes straight to grayscale, big JPEGs at a reduced size
+            return decode_gray(data, self.width_limit())
+        except ValueError:
+            raise ValueError(f"Could not load image: {self.image_path or 'upload'}") from None
+
+    def preprocess_image(self, gray=None):
         """ Optimized for production """
-        img = cv2.imread(self.image_path)
-        if img is None:
-            raise ValueError(f"Could not load image: {self.image_path}")
-        print(img.shape)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if gray is None:
+            gray = self.decode_image()
         
         height, width = gray.shape
-        if width > 1920:
-            scale = 1920 / width
+        limit = self.width_limit()
+        if width > limit:
+            scale = limit / width
             gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        self.coord_scale = min(1.0, self.max_width / gray.shape[1])
+        self.frame_size = (gray.shape[1] * self.coord_scale, gray.shape[0] * self.coord_scale)
+        
+        stages = self.preprocess_stages or (["contrast"] if not self.adaptive_preprocess else None)
+        if stages is None or self.quality_gate:
+            # A few ms on a small copy, raises UnusableImageError when the OCR would be wasted
+            self.quality = measure_quality(gray)
+            if self.quality_gate:
+                check_quality(self.quality)
+            if stages is None:
+                stages = choose_stages(self.quality)
+        self.preprocess_applied = list(stages)
+        for stage in stages:
+            self.metrics.count(f"preprocess_{stage}")
+        if stages != ["contrast"]:
+            self.log(f"Preprocessing: {', '.join(stages)}")
         
-        contrast_img = cv2.convertScaleAbs(gray, alpha=1, beta=-50)
+        contrast_img = run_stages(gray, self.quality, stages, {"contrast": {"alpha": self.contrast_alpha, "beta": self.contrast_beta}})
         # DEBUG: saves the contrasted image
         # cv2.imwrite("debug_high_contrast.jpg", contrast_img)
         return contrast_img
 
-    def get_reading_order(self, result):
+    def width_limit(self):
+        """ Tiled OCR keeps more pixels, the tiles make up for the bigger frame """
+        return self.tile_max_width if self.tile_workers else self.max_width
+
+    def sort_results(self, results):
         """
-        Sorts boxes by Y-coordinate first (with tolerance), then X-coordinate.
+        Sorts boxes line by line, then left to right.
         This ensures 'Yuya' (left) comes before 'Kogure' (right) on the same line.
+        Lines are clustered from the text height instead of fixed 20px buckets, so any resolution works.
+        """
+        return reading_order(results)
+
+    def read_text(self, img):
+        """
+        Runs the OCR. In layout mode, a recognized screen only gets its useful regions read,
+        anything else falls back to the whole frame.
+        """
+        if self.recognizer_only:
+            with self.metrics.stage("ocr_slots"):
+                results = self.read_plates(img)
+            if self.coord_scale != 1.0:
+                results = [shift_result(r, 0, 0, self.coord_scale) for r in results]
+            return results
+        
+        if self.use_layout:
+            profile = find_profile(img)
+            if profile:
+                self.log(f"Using layout: {profile.name}")
+                with self.metrics.stage("ocr_regions"):
+                    results = read_regions(self.reader, img, profile, width_ths=0.7)
+                if self.coord_scale != 1.0:
+                    results = [shift_result(r, 0, 0, self.coord_scale) for r in results]
+                return results
+            self.log("Unknown layout, reading the whole image")
+        
+        if self.tile_workers and max(img.shape) > self.tile_size:
+            with self.metrics.stage("ocr_tiles"):
+                # A 3840px frame keeps its text twice as wide, the overlap has to follow
+                overlap = min(self.tile_size // 2, round(self.tile_overlap / self.coord_scale))
+                return read_tiles(
+                    self.reader, img, self.tile_size, overlap, self.tile_workers,
+                    scale=self.coord_scale, width_ths=0.7
+                )
+        
+        # Same as reader.readtext, split in two so each step can be timed
+        with self.metrics.stage("ocr_detect"):
+            boxes = self.detect_text(img)
+        with self.metrics.stage("ocr_recognize"):
+            return self.recognize_text(img, boxes)
+
+    def read_plates(self, img):
         """
-        bbox = result[0]
-        y_top = bbox[0][1]
-        x_left = bbox[0][0]
+        Recognizer-only OCR: reads the manager and formation lines, then the name plate of every
+        slot of that formation (of all formations if the label can't be read).
+        """
+        profile = find_profile(img)
+        if profile is None or not profile.slots:
+            raise ValueError("Recognizer-only mode needs a known screen layout (16:9 Team Dock)")
+        self.log(f"Using layout: {profile.name} (recognizer only)")
         
-        # Group Y-coordinates into 20px "lines" to handle slight misalignments
-        y_line = int(y_top / 20) * 20 
-        return (y_line, x_left)
+        results = read_regions(self.reader, img, profile, lines_only=True)
+        formation_id = None
+        for _, text, _ in results:
+            code = formation_code(clean_token(text))
+            if code is not None:
+                formation_id = self.detect_formation(clean_token(text), code)[1]
+        return results + read_slots(self.reader, img, profile, formation_id)
+
+    def detect_text(self, img):
+        """ Text detection only, returns EasyOCR's (horizontal_list, free_list) """
+        # width_ths=0.7 helps merge words that are close, but we do manual stitching too
+        horizontal_list, free_list = self.reader.detect(img, width_ths=0.7)
+        return horizontal_list[0], free_list[0]
+
+    def recognize_text(self, img, boxes):
+        """ Reads the text inside the detected boxes, same output as readtext """
+        horizontal_list, free_list = boxes
+        return self.reader.recognize(img, horizontal_list, free_list, detail=1)
 
     def scan(self):
         self.log(f"Scanning image...")
-        processed_img = self.preprocess_image()
+        with self.metrics.stage("preprocess"):
+            processed_img = self.preprocess_image()
         
-        # width_ths=0.7 helps merge words that are close, but we do manual stitching too
-        results = self.reader.readtext(processed_img, detail=1, width_ths=0.7)
+        results = self.read_text(processed_img)
         
         # Sort by Reading Order
-        results.sort(key=self.get_reading_order)
+        with self.metrics.stage("sort"):
+            results = self.sort_results(results)
+        
+        with self.metrics.stage("match"):
+            found_players, found_formation = self.match_tokens(results)
         
+        with self.metrics.stage("formation"):
+            final_formation=self.detect_formation(found_formation[0], found_formation[1])
+        metrics_registry.record(self.metrics)
+        self.progress.flush()
+        return found_players, final_formation
+
+    def match_tokens(self, results):
+        """
+        Walks the sorted OCR results and matches them against the database.
+        Returns the players found and the raw (formation_text, formation_id).
+        """
         found_players = []
-        formation_text = None
-        formation_id = None
         found_formation = (None, None)
+        for event in self.iter_matches(results):
+            if isinstance(event, PlayerMatched):
+                found_players.append(event.player)
+            else:
+                found_formation = (event.text, event.formation_id)
+        return found_players, found_formation
+
+    def iter_matches(self, results, stop_after=None):
+        """
+        Same walk as match_tokens, but yields a PlayerMatched / FormationDetected as soon as
+        each one is resolved. With stop_after, stops once that many players and a formation are found.
+        """
+        found_count = 0
+        found_formation = False
         
         seen_ids = set()
         
-        # Extract text list
-        text_list = [r[1].strip() for r in results]
+        # Normalized and classified once, the loop below only looks things up
+        stream = TokenStream.from_results(results)
+        self.metrics.count("tokens", len(stream))
+        
+        with self.metrics.stage("fuzzy_batch"):
+            self.score_tokens(stream)
         
         # DEBUG: RAW LIST
         # print("\n--- [DEBUG] Full Detected Text List (Sorted) ---")
-        # for idx, t in enumerate(text_list):
-        #     self.log(f"[{idx}] {t}")
-        self.log("------------------------------------------------\n")
+        # for idx, t in enumerate(stream.tokens):
+        #     self.log(f"[{idx}] {t.raw}")
+        self.log("------------------------------------------------\n", "debug")
         
-        i = 0
-        while i < len(text_list):
+        while stream:
+            token = stream.peek()
             
-            # Checks for unwanted chars
-            characters = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz 123456" # ADD "-" IF FORMATION GLITCHES OUT
+            # LOGIC TRACE
+            if self.verbose:
+                self.log(f"👉 Index {stream.position}: Processing '{token.key}'", "debug")
             
-            formations = ["442", "352", "433", "451", "361", "541"]
-            # WITH DASHES IF FORMATION GLITCHES OUT
-            # formations = ["4-4-2", "3-5-2", "4-3-3", "4-5-1", "3-6-1", "5-4-1"]
+            # Formation labels are one token, never part of a name
+            if token.formation_id is not None:
+                self.log(f"      ✅ FORMATION FOUND! -> {token.text}")
+                self.metrics.count("formation")
+                found_formation = True
+                self.formation_text = token.text
+                stream.advance()
+                self.log("   ----------------", "debug")
+                yield FormationDetected(token.text, token.formation_id, self.detect_formation(token.text, token.formation_id))
+            else:
+                start = stream.position
+                player = self.match_player(stream)
+                if player and player['id'] not in seen_ids:
+                    seen_ids.add(player['id'])
+                    position = self.token_position(stream.tokens[start:stream.position])
+                    if position:
+                        self.positions[player['id']] = position
+                    yield PlayerMatched(player, self.confidence[player['id']], found_count, position)
+                    found_count += 1
             
-            match_found = False
-            player_found = None
+            if stop_after and found_formation and found_count >= stop_after and stream:
+                self.log(f"Found {found_count} players and the formation, skipping the last {len(stream) - stream.position} texts", "debug")
+                self.metrics.count("early_stop")
+                return
+
+    def token_position(self, tokens):
+        """ Centre of the tokens' boxes as frame fractions, None without boxes or frame size """
+        if not self.frame_size or any(token.box is None for token in tokens):
+            return None
+        centers = [box_center(token.box) for token in tokens]
+        width, height = self.frame_size
+        x = sum(c[0] for c in centers) / len(centers)
+        y = sum(c[1] for c in centers) / len(centers)
+        return (round(x / width, 4), round(y / height, 4))
+
+    def match_player(self, stream):
+        """
+        Matches the current token (stitched with the next one first) and advances the stream
+        past what it used. Returns the player data or None.
+        """
+        token = stream.peek()
+        
+        player_found = None
+        score = 1.0
+        
+        # --- CHECK 1: STITCHED WORDS (Exact & Fuzzy) ---
+        combined_text = stream.stitched()
+        if combined_text is not None:
+            # Looked up once, and only when there's no exact hit
+            variant = self.catalogue.variant(stream.stitched_raw()) if combined_text not in self.db else None
+            # 1A. Exact Stitched
+            if combined_text in self.db:
+                player_found = self.db[combined_text]
+                self.log(f"      ✅ EXACT STITCHED! -> ID: {player_found['id']} ({player_found['name']})")
+                self.metrics.count("exact_stitched")
+                stream.advance(2)
             
-            current_text = ""
-            for char in text_list[i]:
-                if char in characters:
-                    current_text+=char
-            current_text = current_text.strip()
+            # 1B. Known spelling variant (spaces, accents, flipped order, OCR look-alikes)
+            elif variant is not None:
+                player_found = variant
+                self.log(f"      ✅ VARIANT STITCHED! -> '{stream.stitched_raw()}' = '{player_found['name']}'")
+                self.metrics.count("variant_stitched")
+                stream.advance(2)
             
-            # Checks for formation before lowering
-            for j in range(len(formations)):
-                if formations[j] in current_text:
-                    formation_text=current_text
-                    formation_id=j
-                    match_found = True
-                    i+=1
+            # 1C. Fuzzy Stitched (Fallback) <--- ### NEW 4
+            else:
+                player_found, score = self.fuzzy_lookup(combined_text)
+                if player_found:
+                    self.log(f"      ✨ FUZZY STITCHED! -> '{combined_text}' ≈ '{player_found['name']}'")
+                    self.metrics.count("fuzzy_stitched")
+                    stream.advance(2)
+        
+        # --- CHECK 2: SINGLE WORD (Exact & Fuzzy) ---
+        if not player_found:
+            current_text = token.key
+            variant = self.catalogue.variant(token.raw) if current_text not in self.db else None
+            # 2A. Exact Single
+            if current_text in self.db:
+                player_found = self.db[current_text]
+                score = 1.0
+                self.log(f"      ✅ EXACT SINGLE! -> ID: {player_found['id']} ({player_found['name']})")
+                self.metrics.count("exact_single")
             
-            current_text=current_text.lower()
+            # 2B. Known spelling variant, from the raw read so accents aren't cleaned away
+            elif variant is not None:
+                player_found = variant
+                score = 1.0
+                self.log(f"      ✅ VARIANT SINGLE! -> '{token.raw}' = '{player_found['name']}'")
+                self.metrics.count("variant_single")
             
-            # LOGIC TRACE
-            self.log(f"👉 Index {i}: Processing '{current_text}'")
-
-            # --- CHECK 1: STITCHED WORDS (Exact & Fuzzy) ---
-            if i + 1 < len(text_list):
-                next_text = text_list[i+1].lower().strip()
-                combined_text = f"{current_text} {next_text}"
-                
-                # 1A. Exact Stitched
-                if combined_text in self.db:
-                    player_found = self.db[combined_text]
-                    self.log(f"      ✅ EXACT STITCHED! -> ID: {player_found['id']} ({player_found['name']})")
-                    i += 2
-                    match_found = True
-                
-                # 1B. Fuzzy Stitched (Fallback) <--- ### NEW 4
-                elif not match_found:
-                    fuzzy = self.find_fuzzy_match(combined_text)
-                    if fuzzy:
-                        player_found = fuzzy
-                        self.log(f"      ✨ FUZZY STITCHED! -> '{combined_text}' ≈ '{player_found['name']}'")
-                        i += 2 
-                        match_found = True
+            # 2C. Fuzzy Single (Fallback) <--- ### NEW 4
+            else:
+                player_found, score = self.fuzzy_lookup(current_text)
+                if player_found:
+                    self.log(f"      ✨ FUZZY SINGLE! -> '{current_text}' ≈ '{player_found['name']}'")
+                    self.metrics.count("fuzzy_single")
             
-            # --- CHECK 2: SINGLE WORD (Exact & Fuzzy) ---
-            if not match_found:
-                # 2A. Exact Single
-                if current_text in self.db:
-                    player_found = self.db[current_text]
-                    self.log(f"      ✅ EXACT SINGLE! -> ID: {player_found['id']} ({player_found['name']})")
-                    i += 1
-                    match_found = True
-                
-                # 2B. Fuzzy Single (Fallback) <--- ### NEW 4
-                elif not match_found:
-                    fuzzy = self.find_fuzzy_match(current_text)
-                    if fuzzy:
-                        player_found = fuzzy
-                        self.log(f"      ✨ FUZZY SINGLE! -> '{current_text}' ≈ '{player_found['name']}'")
-                        i += 1
-                        match_found = True
-
             # If still no match
-            if not match_found:
-                i += 1
-                
-            # Add to found list
-            if match_found and player_found:
-                if player_found['id'] not in seen_ids:
-                    found_players.append(player_found)
-                    seen_ids.add(player_found['id'])
-            # If only match found, then we found a formation
-            elif match_found:
-                self.log(f"      ✅ FORMATION FOUND! -> {formation_text}")
-                found_formation=(formation_text, formation_id)
+            if not player_found:
+                self.metrics.count("unmatched")
+            stream.advance()
             
-            self.log("   ----------------")
+        # Keep the first (reading order) score of each player
+        if player_found and player_found['id'] not in self.confidence:
+            self.confidence[player_found['id']] = score
         
-        final_formation=self.detect_formation(found_formation[0], found_formation[1])
-        return found_players, final_formation
+        self.log("   ----------------", "debug")
+        return player_found
     
+    def settings_fingerprint(self, stop_after=0):
+        """
+        Everything besides the image that can change the result, used in the result cache key.
+        """
+        return json.dumps({
+            "db": self.catalogue.version,
+            "fuzzy_threshold": self.fuzzy_threshold,
+            "max_width": self.max_width,
+            "contrast": [self.contrast_alpha, self.contrast_beta],
+            "preprocess": self.preprocess_stages or ("adaptive" if self.adaptive_preprocess else "fixed"),
+            "quality_gate": self.quality_gate,
+            "use_layout": self.use_layout,
+            "recognizer_only": self.recognizer_only,
+            "tiles": [self.tile_max_width, self.tile_size, self.tile_overlap] if self.tile_workers else None,
+            # An early-stopped scan can miss extra matches, so it's cached apart from a full one
+            "stop_after": stop_after
+        }, sort_keys=True)
+
+    def cache_key(self, cache, stop_after=0):
+        data = self.load_image()
+        if isinstance(data, np.ndarray):
+            data = str(data.shape).encode() + np.ascontiguousarray(data).tobytes()
+        return cache.make_key(data, self.settings_fingerprint(stop_after))
+
+    def scan_events(self, cache=None, stop_after=None):
+        """
+        Generator version of scan_export: yields PlayerMatched and FormationDetected as soon as
+        they're found, then CoachInferred (if any) and finally ScanComplete with the export data.
+        Stops reading tokens once stop_after players (default 12, 0 = never) and a formation are found.
+        """
+        if stop_after is None:
+            stop_after = self.stop_after
+        
+        key = None
+        if cache is not None:
+            key = self.cache_key(cache, stop_after)
+            entry = cache.get(key)
+            if entry is not None:
+                self.log("♻️ Already scanned this screenshot, reusing the result.")
+                self.metrics.count("cache_hit")
+                self.progress.flush()
+                yield ScanComplete(entry["team"], cached=True)
+                return
+        
+        self.log(f"Scanning image...")
+        with self.metrics.stage("preprocess"):
+            processed_img = self.preprocess_image()
+        
+        settings = None
+        if cache is not None:
+            # Same screen recompressed or resized: no need to OCR it again
+            settings = self.settings_fingerprint(stop_after)
+            with self.metrics.stage("near_duplicate"):
+                entry = cache.get_similar(processed_img, settings)
+            if entry is not None:
+                self.log("♻️ Near-duplicate of a screenshot already scanned, reusing the result.")
+                self.metrics.count("near_duplicate_hit")
+                cache.put(key, entry)
+                self.progress.flush()
+                yield ScanComplete(entry["team"], cached=True)
+                return
+        
+        results = self.read_text(processed_img)
+        
+        with self.metrics.stage("sort"):
+            results = self.sort_results(results)
+        
+        players = []
+        found_formation = (None, None)
+        matches = self.iter_matches(results, stop_after)
+        while True:
+            # Only the matcher's own time counts, not the time the consumer spends on each event
+            with self.metrics.stage("match"):
+                event = next(matches, None)
+            if event is None:
+                break
+            if isinstance(event, PlayerMatched):
+                players.append(event.player)
+            else:
+                found_formation = (event.text, event.formation_id)
+            yield event
+        
+        with self.metrics.stage("formation"):
+            formation = self.detect_formation(*found_formation)
+        
+        coach = self.layout_team(players, formation)[0]
+        if coach:
+            yield CoachInferred(coach, self.confidence.get(coach['id'], 1.0))
+        
+        with self.metrics.stage("export"):
+            data = self.export_json(players, formation) if players else None
+        metrics_registry.record(self.metrics)
+        self.progress.flush()
+        
+        if cache is not None:
+            cache.put(key, {"team": data}, image=processed_img, settings=settings)
+        yield ScanComplete(data)
+
+    def scan_export(self, cache=None, stop_after=0):
+        """
+        scan() + export_json() in one go. Returns the export data, or None if no players were found.
+        With a ResultCache, the same screenshot with the same settings is only scanned once.
+        """
+        for event in self.scan_events(cache, stop_after):
+            if isinstance(event, ScanComplete):
+                return event.data
+
     def detect_formation(self, text, id):
         
         # ID list
@@ -251,7 +640,7 @@ class ExactTeamScanner:
         # 5 : 4-5-1 Balanced           3
         # 6 : 3-6-1 Hexa               4
         # 7 : 5-4-1 Double Volante     5
-        formations_list=["4-4-2 Diamond", "4-4-2 Box", "3-5-2 Freedom", "4-3-3 Triangle", "4-3-3 Delta", "4-5-1 Balanced", "3-6-1 Hexa", "5-4-1 Double Volante"]
+        formations_list=FORMATIONS
 
         if text == None and id == None:
             return formations_list[0], 0
@@ -278,47 +667,103 @@ class ExactTeamScanner:
         # If nothing else worked, return the first formation
         return formations_list[0], 0
 
+    def split_coach(self, players, formation):
+        """
+        Returns (coach or None, players without the coach).
+        The coach is guessed from the reading order, which depends on the formation.
+        """
+        # If we have 12 players, there is a coach that isn't the OC character
+        if len(players) < 12:
+            return None, players
+        
+        # Almost all formations make the program read some FW before the coach
+        if formation[1] in [1]:
+            return players[2], players[:2]+players[3:]
+        elif formation[1] in [2, 3, 4, 5, 6]:
+            return players[1], [players[0]]+players[2:]
+        else:
+            return players[0], players[1:]
+
+    def layout_team(self, players, formation):
+        """
+        Returns (coach or None, starters, roles or None, formation).
+        On a known screen, the coach is whoever was read on the manager panel and every starter
+        goes to the nearest free slot of the formation template (starters are then in slot order:
+        GK, DF, MF, FW, then any that fit no slot, with role None). Without positions or a template,
+        falls back to split_coach.
+        When no formation label was read, the template that fits the names best picks the formation.
+        """
+        profile = find_profile_size(*self.frame_size) if self.frame_size else None
+        if profile and profile.slots:
+            if self.formation_text is not None:
+                candidates = [formation]
+            else:
+                candidates = [self.detect_formation_id(formation_id) for formation_id in profile.slots]
+            
+            best = None
+            for candidate in candidates:
+                placed = place_team(players, self.positions, profile, candidate[1])
+                # A template that places fewer than half a team isn't this screen
+                if not placed or placed[2] < 6:
+                    continue
+                # Most players placed, then closest to the template
+                rank = (placed[2], -placed[3])
+                if best is None or rank > best[0]:
+                    best = (rank, placed, candidate)
+            
+            if best:
+                _, (coach, team, _, _), formation = best
+                self.metrics.count("spatial_layout")
+                return coach, [player for _, player in team], [role for role, _ in team], formation
+        
+        coach, final_team = self.split_coach(players, formation)
+        return coach, final_team, None, formation
+
+    def detect_formation_id(self, formation_id):
+        """ (name, id) of a formation id, the same pair detect_formation returns """
+        return FORMATIONS[formation_id], formation_id
+
     def export_json(self, players, formation):
         count = len(players)
         self.log(f"\n--- LOGIC CHECK: Found {count} players ---")
         
+        coach, final_team, roles, formation = self.layout_team(players, formation)
         coach_name = "None"
-        final_team = players
-        
-        count = len(players)
-        # If we have 12 players, there is a coach that isn't the OC character
-        if count >= 12:
-                # Almost all formations make the program read some FW before the coach
-                if formation[1] in [1]:
-                    coach_name = players[2]['name']
-                    final_team=final_team[:2]+final_team[3:]
-                    
-                elif formation[1] in [2, 3, 4, 5, 6]:
-                    coach_name = players[1]['name']
-                    final_team=[final_team[0]]+final_team[2:]
-
-                else:
-                    coach_name = players[0]['name']
-                    final_team=final_team[1:]
-                
-                self.log(f"👉 Auto-Logic: Coach is {coach_name}")
+        if coach:
+            coach_name = coach['name']
+            self.log(f"👉 Auto-Logic: Coach is {coach_name}")
 
         data = {
             "team_count": len(final_team),
             "coach": coach_name,
             "formation_structure": [p['name'] for p in final_team],
-            "formation_layout": formation[0]
+            "formation_layout": formation[0],
+            # Role of each formation_structure entry (GK, DF, MF, FW) when the screen layout is known,
+            # None for a name that fit no slot of the formation
+            "positions": roles,
+            # How close each OCR read was to the matched name (1.0 = exact), same order as formation_structure
+            "confidence": [round(self.confidence.get(p['id'], 1.0), 3) for p in final_team],
+            "coach_confidence": round(self.confidence.get(coach['id'], 1.0), 3) if coach else None,
+            # Database IDs, so the export can be joined back to db.csv without going through the names
+            "player_ids": [p['id'] for p in final_team],
+            "coach_id": coach['id'] if coach else None,
+            # Which database (db.csv digest + applied delta changes) the names were matched against
+            "db_version": self.catalogue.version
         }
         
         # Deprecated export
 #         with open('../../exports/team_export.json', 'w', encoding='utf-8') as f:
 #             json.dump(data, f, indent=4, ensure_ascii=False)
         self.log("🎉 Done! Download your team_export.json below.")
+        self.progress.flush()
         return data
 
 if __name__ == "__main__":
-    CSV_FILE = "../players/db.csv"
-    IMG_FILE = "../../test_screenshots/3.png"
+    # Run from the repo root: python -m assets.package.detector [image]
+    # (batch.py is the command-line tool for real use, this is a quick manual check)
+    PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+    CSV_FILE = os.path.join(PACKAGE_DIR, "..", "players", "db.csv")
+    IMG_FILE = sys.argv[1] if len(sys.argv) > 1 else os.path.join(PACKAGE_DIR, "..", "..", "test_screenshots", "3.png")
     try:
         scanner = ExactTeamScanner(CSV_FILE, IMG_FILE)
         team = scanner.scan()
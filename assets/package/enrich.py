@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+from assets.package.catalogue import delta_path, get_catalogue
+
+DEFAULT_DB = "assets/players/db.csv"
+
+# db.csv column -> enriched field
+PLAYER_COLUMNS = {
+    "ID": "id",
+    "Name(Romaji)": "name",
+    "Name(Localised)": "name_localised",
+    "Gender": "gender",
+    "Type": "type",
+    "Position": "position",
+    "Alt Position": "alt_position",
+    "Element": "element",
+    "Preferred Playstyle": "playstyle",
+    "Total Stats": "stats",
+    "usage_rate": "usage_rate",
+}
+POSITIONS = ["GK", "DF", "MF", "FW"]
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+def player_table(csv_path=DEFAULT_DB):
+    """
+    Every db.csv column as a DataFrame indexed by ID, with the delta log applied, loaded once per process
+    (and again when the CSV or the log changes), like get_catalogue.
+    """
+    key = os.path.abspath(csv_path)
+    delta = delta_path(key)
+    stamp = (os.stat(key).st_mtime_ns, os.stat(delta).st_size if os.path.exists(delta) else 0)
+    with _tables_lock:
+        cached = _tables.get(key)
+        if cached is None or cached[0] != stamp:
+            table = read_players(key)
+            if stamp[1]:
+                table = apply_delta(table, read_players(delta, ["op"]))
+            cached = (stamp, table.set_index("id"))
+            _tables[key] = cached
+        return cached[1]
+
+def read_players(path, extra=()):
+    usecols = list(extra) + list(PLAYER_COLUMNS)
+    table = pd.read_csv(path, usecols=lambda column: column in usecols).rename(columns=PLAYER_COLUMNS)
+    for column in ("name", "name_localised"):
+        if column in table:
+            table[column] = table[column].str.strip()
+    return table
+
+def apply_delta(table, delta):
+    """ Same rules as PlayerCatalogue.apply: the last change to an ID wins, remove drops it """
+    delta = delta.assign(op=delta["op"].str.strip().str.lower()).dropna(subset=["id"])
+    delta = delta[delta["op"].isin(["add", "update", "remove"])].drop_duplicates("id", keep="last")
+    kept = table[~table["id"].isin(delta["id"])]
+    changed = delta[delta["op"] != "remove"].drop(columns="op")
+    return pd.concat([kept, changed], ignore_index=True).astype({"id": table["id"].dtype})
+
+def read_teams(lines, name="-"):
+    """
+    Yields (source, export data) from JSON lines: batch.py records ({"file", "ok", "result"})
+    or bare export_json objects. Failed scans and scans without players are skipped.
+    source is always a string: the scanned file, or "<name>:<line number>" for bare exports.
+    """
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if "result" in record or "ok" in record:
+            if record.get("ok") and record.get("result"):
+                yield str(record.get("file") or f"{name}:{number}"), record["result"]
+        else:
+            yield f"{name}:{number}", record
+
+def player_ids(team, lookup):
+    """ IDs of the starters and the coach, from the export's IDs or, for older exports, its names """
+    ids = team.get("player_ids")
+    if ids is None:
+        ids = [lookup[name.lower()].id if name.lower() in lookup else None for name in team.get("formation_structure", [])]
+    coach_id = team.get("coach_id")
+    if coach_id is None and team.get("coach") not in (None, "None"):
+        coach = lookup.get(team["coach"].lower())
+        coach_id = coach.id if coach else None
+    return ids, coach_id
+
+def enrich_teams(teams, csv_path=DEFAULT_DB):
+    """
+    Joins a batch of exported teams with the player database in one pass.
+    teams is a list of (source, export data). Returns two DataFrames:
+    one row per team (formation, coach and aggregates) and one row per starter (every db.csv column).
+    """
+    table = player_table(csv_path)
+    lookup = get_catalogue(csv_path).lookup
+
+    team_rows, slot_team, slot_index, slot_role, slot_id = [], [], [], [], []
+    for number, (source, team) in enumerate(teams):
+        ids, coach_id = player_ids(team, lookup)
+        # Older exports have no roles, or none when the layout wasn't known
+        roles = (list(team.get("positions") or []) + [None] * len(ids))[:len(ids)]
+        team_rows.append({
+            "team": number,
+            "source": str(source),
+            "formation": team.get("formation_layout"),
+            "coach_id": coach_id,
+        })
+        slot_team.extend([number] * len(ids))
+        slot_index.extend(range(len(ids)))
+        slot_role.extend(roles)
+        slot_id.extend(ids)
+
+    teams_df = pd.DataFrame(team_rows, columns=["team", "source", "formation", "coach_id"]).set_index("team")
+    # Nullable ints: a batch where no coach was found would otherwise give an object column the join rejects
+    teams_df["coach_id"] = pd.array(teams_df["coach_id"].tolist(), dtype="Int64")
+    slots = pd.DataFrame({
+        "team": np.asarray(slot_team, dtype=np.int64),
+        "slot": np.asarray(slot_index, dtype=np.int64),
+        "role": pd.array(slot_role, dtype="string"),
+        "id": pd.array(slot_id, dtype="Int64"),
+    })
+    players_df = slots.join(table, on="id")
+
+    # Aggregates, one groupby / crosstab over every team at once
+    grouped = players_df.groupby("team")
+    aggregates = pd.DataFrame({
+        "team_count": grouped.size(),
+        "total_stats": grouped["stats"].sum(min_count=1),
+        "avg_stats": grouped["stats"].mean().round(1),
+        "avg_usage_rate": grouped["usage_rate"].mean(),
+    })
+    # Fixed columns (every element of the database, every position) so the schema doesn't depend on the batch
+    elements = sorted(table["element"].dropna().unique())
+    element_counts = pd.crosstab(players_df["team"], players_df["element"]).reindex(columns=elements, fill_value=0)
+    position_counts = pd.crosstab(players_df["team"], players_df["position"]).reindex(columns=POSITIONS, fill_value=0)
+    element_counts.columns = [f"element_{e.lower()}" for e in elements]
+    position_counts.columns = [f"position_{p.lower()}" for p in POSITIONS]
+
+    coaches = table[["name", "name_localised"]].add_prefix("coach_")
+    teams_df = (
+        teams_df.join(coaches, on="coach_id")
+        .join(aggregates)
+        .join(element_counts)
+        .join(position_counts)
+    )
+    count_columns = ["team_count"] + list(element_counts.columns) + list(position_counts.columns)
+    teams_df[count_columns] = teams_df[count_columns].fillna(0).astype(np.int64)
+    return teams_df, players_df
+
+def write_jsonl(teams_df, players_df, output):
+    """
+    One line per team: its columns + "players", its starters in formation order.
+    Rows are serialized by pandas in bulk, Python only stitches the strings together.
+    """
+    team_lines = teams_df.to_json(orient="records", lines=True, force_ascii=False).splitlines()
+    player_lines = players_df.drop(columns="team").to_json(orient="records", lines=True, force_ascii=False).splitlines()
+
+    players = {team: [] for team in teams_df.index}
+    for team, line in zip(players_df["team"].tolist(), player_lines):
+        players[team].append(line)
+    for team, line in zip(teams_df.index, team_lines):
+        # Drop the closing brace and append the players list
+        output.write(f'{line[:-1]},"players":[{",".join(players[team])}]}}\n')
+
+def write_parquet(teams_df, players_df, path):
+    """
+    Writes <path> (one row per team) and <path without .parquet>.players.parquet (one row per starter),
+    joinable on the team column. Needs pyarrow.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from None
+    teams_df.to_parquet(path, engine="pyarrow")
+    players_path = os.path.splitext(path)[0] + ".players.parquet"
+    players_df.to_parquet(players_path, engine="pyarrow", index=False)
+    return path, players_path
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enrich scanned teams with the player database (JSON Lines or Parquet).")
+    parser.add_argument("inputs", nargs="*", default=["-"], help="batch.py .jsonl outputs or export JSON lines (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Output file, .parquet for Parquet, anything else for JSON Lines (default: stdout)")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Path to the player database CSV")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    teams = []
+    for path in args.inputs:
+        if path == "-":
+            teams.extend(read_teams(sys.stdin, "stdin"))
+        else:
+            with open(path, encoding="utf-8") as f:
+                teams.extend(read_teams(f, path))
+
+    teams_df, players_df = enrich_teams(teams, args.db)
+
+    if args.output.endswith(".parquet"):
+        written = write_parquet(teams_df, players_df, args.output)
+        destination = " and ".join(written)
+    elif args.output == "-":
+        write_jsonl(teams_df, players_df, sys.stdout)
+        destination = "stdout"
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            write_jsonl(teams_df, players_df, f)
+        destination = args.output
+
+    elapsed = time.perf_counter() - start
+    print(f"🎉 Enriched {len(teams_df)} teams ({len(players_df)} players) in {elapsed:.2f}s -> {destination}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+class ScanEvent:
+    """ Base class of what ExactTeamScanner.scan_events yields """
+    __slots__ = ()
+    kind = "event"
+
+    def to_dict(self):
+        return {"kind": self.kind}
+
+
+class PlayerMatched(ScanEvent):
+    __slots__ = ('player', 'score', 'index', 'position')
+    kind = "player"
+
+    def __init__(self, player, score, index, position=None):
+        self.player = player
+        # Similarity of the OCR read to the name, 1.0 = exact
+        self.score = score
+        # Position in the list of players found so far
+        self.index = index
+        # (x, y) centre of the name as frame fractions, None if unknown
+        self.position = position
+
+    def to_dict(self):
+        return {"kind": self.kind, "index": self.index, "name": self.player['name'], "id": self.player['id'], "confidence": round(self.score, 3), "position": self.position}
+
+
+class FormationDetected(ScanEvent):
+    __slots__ = ('text', 'formation_id', 'layout')
+    kind = "formation"
+
+    def __init__(self, text, formation_id, layout):
+        self.text = text
+        self.formation_id = formation_id
+        # (name, id) as returned by detect_formation
+        self.layout = layout
+
+    def to_dict(self):
+        return {"kind": self.kind, "text": self.text, "layout": self.layout[0]}
+
+
+class CoachInferred(ScanEvent):
+    __slots__ = ('player', 'score')
+    kind = "coach"
+
+    def __init__(self, player, score):
+        self.player = player
+        self.score = score
+
+    def to_dict(self):
+        return {"kind": self.kind, "name": self.player['name'], "id": self.player['id'], "confidence": round(self.score, 3)}
+
+
+class ScanComplete(ScanEvent):
+    __slots__ = ('data', 'cached')
+    kind = "complete"
+
+    def __init__(self, data, cached=False):
+        # export_json payload, None if no players were found
+        self.data = data
+        self.cached = cached
+
+    def to_dict(self):
+        return {"kind": self.kind, "data": self.data, "cached": self.cached}
@@ -0,0 +1,86 @@
+import difflib
+from collections import defaultdict, Counter
+
+class FuzzyIndex:
+    """
+    Character trigram inverted index over the player names.
+    Gives the exact same answer as difflib.get_close_matches over the full list,
+    but only runs SequenceMatcher on the few names that can actually pass the cutoff.
+    """
+    def __init__(self, names):
+        self.names = list(names)
+
+        # Names grouped by length, used when the trigram bound is too weak to prune
+        self.by_length = defaultdict(list)
+        # trigram -> name length -> list of (name index, how many times it appears in that name)
+        self.postings = {}
+
+        for idx, name in enumerate(self.names):
+            self.by_length[len(name)].append(idx)
+            for gram, count in self.trigrams(name).items():
+                self.postings.setdefault(gram, {}).setdefault(len(name), []).append((idx, count))
+
+    @staticmethod
+    def trigrams(text):
+        return Counter(text[k:k+3] for k in range(len(text) - 2))
+
+    def length_range(self, size, cutoff):
+        """
+        A ratio of 2*M/(la+lb) can't reach the cutoff if the lengths are too far apart
+        (that's what SequenceMatcher.real_quick_ratio checks).
+        """
+        low = int(size * cutoff / (2 - cutoff))
+        high = int(size * (2 - cutoff) / cutoff) + 1
+        return max(low, 0), high
+
+    def candidates(self, text, cutoff):
+        """
+        Returns every name that could score >= cutoff against text.
+        If a pair scores >= cutoff, the matching blocks found by SequenceMatcher share
+        at least (2.5*cutoff - 2)*(la+lb) - 2 trigrams, so anything below that is dropped.
+        """
+        low, high = self.length_range(len(text), cutoff)
+        query = self.trigrams(text)
+
+        result = []
+        for size in range(low, high + 1):
+            # Minimum number of shared trigrams for this name length
+            needed = (2.5 * cutoff - 2) * (len(text) + size) - 2
+            if needed <= 0:
+                result.extend(self.names[idx] for idx in self.by_length.get(size, ()))
+                continue
+
+            shared = Counter()
+            for gram, q_count in query.items():
+                by_size = self.postings.get(gram)
+                if by_size is None:
+                    continue
+                for idx, count in by_size.get(size, ()):
+                    shared[idx] += min(q_count, count)
+            result.extend(self.names[idx] for idx, hits in shared.items() if hits >= needed)
+        return result
+
+    def get_close_matches(self, text, n=1, cutoff=0.85):
+        """ Drop-in for difflib.get_close_matches(text, names, n, cutoff) """
+        return difflib.get_close_matches(text, self.candidates(text, cutoff), n=n, cutoff=cutoff)
+
+
+class LayeredFuzzyIndex:
+    """
+    A FuzzyIndex plus the names added and removed since it was built, so a database update
+    doesn't rebuild the whole index. The added names get a small index of their own,
+    removed ones are filtered out of the base's candidates. Same answers as a rebuilt index.
+    """
+    def __init__(self, base, added, removed):
+        self.base = base
+        self.added = FuzzyIndex(added)
+        self.removed = frozenset(removed)
+
+    def candidates(self, text, cutoff):
+        base = self.base.candidates(text, cutoff)
+        if self.removed:
+            base = [name for name in base if name not in self.removed]
+        return base + self.added.candidates(text, cutoff)
+
+    def get_close_matches(self, text, n=1, cutoff=0.85):
+        return difflib.get_close_matches(text, self.candidates(text, cutoff), n=n, cutoff=cutoff)
@@ -0,0 +1,83 @@
+import os
+import struct
+import cv2
+import numpy as np
+
+# cv2 flags that let libjpeg decode straight to 1/2, 1/4 or 1/8 of the size
+REDUCED_GRAYSCALE = [
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2),
+]
+
+def read_source(source):
+    """
+    Returns the raw encoded bytes of an image given as a path, bytes or a file-like object.
+    NumPy arrays are already decoded, so they're returned as is.
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    if hasattr(source, 'read'):
+        return source.read()
+    raise TypeError(f"Unsupported image source: {type(source).__name__}")
+
+def image_size(data):
+    """
+    Reads (width, height) from a PNG or JPEG header without decoding the image.
+    Returns None for anything else.
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and len(data) >= 24:
+        width, height = struct.unpack('>II', data[16:24])
+        return width, height
+
+    if data[:2] == b'\xff\xd8':
+        pos = 2
+        while pos + 9 < len(data):
+            if data[pos] != 0xFF:
+                pos += 1
+                continue
+            marker = data[pos + 1]
+            # SOF0..SOF15 hold the frame size (C4, C8 and CC are other markers)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', data[pos + 5:pos + 9])
+                return width, height
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                pos += 2
+                continue
+            length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+            pos += 2 + length
+    return None
+
+def decode_gray(data, max_width=None):
+    """
+    Decodes encoded image bytes straight to grayscale.
+    Big JPEGs are decoded at a reduced scale (still >= max_width) so the full-size image never exists.
+    """
+    flag = cv2.IMREAD_GRAYSCALE
+    size = image_size(data) if max_width else None
+    if size and data[:2] == b'\xff\xd8':
+        for factor, reduced_flag in REDUCED_GRAYSCALE:
+            if size[0] // factor >= max_width:
+                flag = reduced_flag
+                break
+
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    gray = cv2.imdecode(buffer, flag)
+    if gray is None:
+        raise ValueError("Could not decode image")
+    return gray
+
+def to_gray(img):
+    """ Grayscale version of an already decoded (BGR, BGRA or gray) array """
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
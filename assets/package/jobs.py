@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+class QueueFullError(RuntimeError):
+    """ submit() was called with max_pending jobs already waiting or running """
+
+
+class ScanJob:
+    """
+    One scan submitted to a JobExecutor. The worker thread fills it in as the scan goes,
+    the page reads it with snapshot() whenever it polls.
+    """
+    def __init__(self, job_id):
+        self.id = job_id
+        # queued -> running -> done | failed
+        self.status = "queued"
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Latest buffered progress messages, the events seen so far and the export data
+        self.logs = []
+        self.events = []
+        self.result = None
+        self.cached = False
+        self.error = None
+        # UnusableImageError.reason when the quality gate rejected the image
+        self.reason = None
+        self.lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def update_logs(self, events):
+        with self.lock:
+            self.logs = events
+
+    def add_event(self, event):
+        with self.lock:
+            self.events.append(event)
+
+    def snapshot(self):
+        """ Consistent copy of the job state, safe to read from another thread """
+        with self.lock:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "logs": list(self.logs),
+                "events": list(self.events),
+                "result": self.result,
+                "cached": self.cached,
+                "error": self.error,
+                "reason": self.reason,
+                "waited": (self.started or time.time()) - self.created,
+                "elapsed": (self.finished or time.time()) - self.started if self.started else 0.0,
+            }
+
+
+class JobExecutor:
+    """
+    Runs scans off the caller's thread. submit() returns a job id right away and a bounded
+    thread pool works through the jobs: workers caps how many OCR passes run at once for the whole
+    process (every session shares the one loaded reader), max_pending caps the backlog.
+    Finished jobs are forgotten after keep_seconds.
+    """
+    def __init__(self, workers=None, max_pending=16, keep_seconds=600, threads=None):
+        self.workers = workers or max(1, min(2, os.cpu_count() or 1))
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        # Torch threads per scan, so workers x threads stays within the cores
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scan")
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def submit(self, csv_path, image, cache=None, **scanner_args):
+        """ Queues a scan of image (bytes, path or array), returns the job id """
+        with self.lock:
+            self.forget_old()
+            if sum(job.active for job in self.jobs.values()) >= self.max_pending:
+                raise QueueFullError(f"{self.max_pending} scans are already waiting")
+            job = ScanJob(uuid.uuid4().hex)
+            self.jobs[job.id] = job
+        self.pool.submit(self.run, job, csv_path, image, cache, scanner_args)
+        return job.id
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def forget_old(self):
+        # Caller holds the lock
+        limit = time.time() - self.keep_seconds
+        for job_id in [j.id for j in self.jobs.values() if j.finished and j.finished < limit]:
+            del self.jobs[job_id]
+
+    def run(self, job, csv_path, image, cache, scanner_args):
+        with job.lock:
+            job.status = "running"
+            job.started = time.time()
+        try:
+            from assets.package.detector import ExactTeamScanner, load_model
+            load_model(self.threads, scanner_args.get("recognizer_only", False))
+
+            scanner = ExactTeamScanner(csv_path, image, **scanner_args)
+            scanner.set_callback(job.update_logs)
+            for event in scanner.scan_events(cache=cache):
+                if event.kind == "complete":
+                    with job.lock:
+                        job.result = event.data
+                        job.cached = event.cached
+                    break
+                job.add_event(event)
+            status = "done"
+        except Exception as e:
+            with job.lock:
+                job.error = f"{type(e).__name__}: {e}"
+                job.reason = getattr(e, "reason", None)
+            status = "failed"
+        with job.lock:
+            job.status = status
+            job.finished = time.time()
+
+    def stats(self):
+        with self.lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "done", "failed")}
+
+    def shutdown(self, wait=True):
+        self.pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor(workers=None, max_pending=16):
+    """ Returns the process-wide executor (shared by every Streamlit session), created on first use """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = JobExecutor(workers, max_pending)
+        return _executor
@@ -12,6 +12,11 @@ class LangDict:
                 "scan_button": "⚡ Scan Team",
                 "spinner": "Scanning team...",
                 "no_players": "No players found. Try a clearer screenshot.",
+                "partial_team": "Found so far",
+                "queued": "Waiting for a free scanner...",
+                "queue_full": "Too many scans are running right now, please try again in a moment.",
+                "unusable_blank": "This image looks blank. Upload a screenshot of the Formation screen.",
+                "unusable_blurred": "This image is too blurry to read. Try a sharper screenshot (or hold the phone still).",
                 "instructions_title": "### How to use Ina-lyser",
                 "step_1": "1. **Launch Inazuma Eleven: Victory Road** and go to the **Formation** screen.",
                 "step_2": "2. **Press the Nickname button** (x on keyboard) to ensure full names are shown (works with Japanese AND international names).",
@@ -33,6 +38,11 @@ class LangDict:
                 "scan_button": "⚡ Scanner l'équipe",
                 "spinner": "Analyse de l'équipe...",
                 "no_players": "Aucun joueur trouvé. Essayez une capture plus claire.",
+                "partial_team": "Trouvés pour l'instant",
+                "queued": "En attente d'un scanner libre...",
+                "queue_full": "Trop de scans sont en cours, réessayez dans un instant.",
+                "unusable_blank": "Cette image semble vide. Téléchargez une capture du menu Formation.",
+                "unusable_blurred": "Cette image est trop floue pour être lue. Essayez une capture plus nette (ou tenez le téléphone immobile).",
                 "instructions_title": "### Comment utiliser Ina-lyser",
                 "step_1": "1. **Lancez Inazuma Eleven: Victory Road** et allez dans le menu **Formation**.",
                 "step_2": "2. **Appuyez sur le bouton Surnom** (x sur le clavier) pour afficher les noms complets (fonctionne avec les noms japonais ET internationaux).",
@@ -0,0 +1,170 @@
+class Region:
+    """
+    A part of the team screen, stored as fractions of the frame so it works at any resolution.
+    'detect' regions go through the full EasyOCR pipeline (text can be anywhere inside),
+    'line' regions hold a single line of text and go straight to the recognizer.
+    """
+    def __init__(self, name, x0, y0, x1, y1, mode="detect"):
+        self.name = name
+        self.box = (x0, y0, x1, y1)
+        self.mode = mode
+
+    def crop(self, img):
+        """ Returns the cropped image and its (x, y) offset in the frame """
+        height, width = img.shape[:2]
+        x0, y0, x1, y1 = self.box
+        left, top = int(x0 * width), int(y0 * height)
+        right, bottom = int(x1 * width), int(y1 * height)
+        return img[top:bottom, left:right], (left, top)
+
+
+class LayoutProfile:
+    """
+    A known screen: its aspect ratio, the regions worth reading and, optionally, where each
+    formation puts its 11 name plates (slots[formation_id] = [(role, x, y), ...] as frame fractions).
+    """
+    def __init__(self, name, aspect, regions, tolerance=0.02, slots=None):
+        self.name = name
+        self.aspect = aspect
+        self.regions = regions
+        self.tolerance = tolerance
+        self.slots = slots or {}
+
+    def matches(self, img):
+        height, width = img.shape[:2]
+        return self.matches_size(width, height)
+
+    def matches_size(self, width, height):
+        return abs(width / height - self.aspect) <= self.aspect * self.tolerance
+
+    def region(self, name):
+        for region in self.regions:
+            if region.name == name:
+                return region
+        return None
+
+
+def scale_slots(slots, width, height):
+    """ Pixel positions measured on a width x height capture -> frame fractions """
+    return {
+        formation_id: [(role, x / width, y / height) for role, x, y in positions]
+        for formation_id, positions in slots.items()
+    }
+
+# Centre of each starter's name plate, per formation id of detect_formation, measured on 1920x1080 captures
+TEAM_DOCK_SLOTS = {
+    # 4-4-2 Diamond
+    0: [("GK", 1300, 914), ("DF", 1045, 657), ("DF", 1550, 657), ("DF", 1200, 783), ("DF", 1418, 783),
+        ("MF", 1290, 381), ("MF", 1155, 514), ("MF", 1463, 514), ("MF", 1273, 644), ("FW", 1090, 348), ("FW", 1500, 348)],
+    # 4-4-2 Box
+    1: [("GK", 1300, 914), ("DF", 1048, 712), ("DF", 1550, 712), ("DF", 1103, 843), ("DF", 1513, 843),
+        ("MF", 1103, 451), ("MF", 1497, 451), ("MF", 1160, 584), ("MF", 1420, 584), ("FW", 1190, 323), ("FW", 1400, 323)],
+    # 3-5-2 Freedom
+    2: [("GK", 1300, 914), ("DF", 1058, 772), ("DF", 1308, 787), ("DF", 1543, 772), ("MF", 1050, 504),
+        ("MF", 1308, 489), ("MF", 1550, 504), ("MF", 1127, 644), ("MF", 1452, 644), ("FW", 1135, 338), ("FW", 1455, 338)],
+    # 4-3-3 Triangle
+    3: [("GK", 1300, 914), ("DF", 1022, 652), ("DF", 1575, 652), ("DF", 1198, 783), ("DF", 1420, 783),
+        ("MF", 1273, 458), ("MF", 1095, 504), ("MF", 1523, 504), ("FW", 1038, 353), ("FW", 1292, 323), ("FW", 1552, 353)],
+    # 4-3-3 Delta
+    4: [("GK", 1300, 914), ("DF", 1070, 610), ("DF", 1545, 610), ("DF", 1200, 743), ("DF", 1400, 743),
+        ("MF", 1158, 469), ("MF", 1424, 469), ("MF", 1308, 618), ("FW", 1027, 338), ("FW", 1300, 323), ("FW", 1555, 338)],
+    # 4-5-1 Balanced
+    5: [("GK", 1300, 914), ("DF", 1035, 659), ("DF", 1560, 659), ("DF", 1188, 783), ("DF", 1428, 783), ("MF", 1030, 384),
+        ("MF", 1560, 384), ("MF", 1273, 454), ("MF", 1098, 526), ("MF", 1518, 526), ("FW", 1290, 318)],
+    # 3-6-1 Hexa
+    6: [("GK", 1300, 914), ("DF", 1045, 772), ("DF", 1308, 781), ("DF", 1557, 772), ("MF", 1080, 366), ("MF", 1512, 366),
+        ("MF", 1068, 498), ("MF", 1545, 498), ("MF", 1157, 644), ("MF", 1425, 644), ("FW", 1290, 333)],
+    # 5-4-1 Double Volante
+    7: [("GK", 1300, 914), ("DF", 1075, 647), ("DF", 1507, 647), ("DF", 1093, 778), ("DF", 1292, 777), ("DF", 1520, 778),
+        ("MF", 1090, 384), ("MF", 1518, 384), ("MF", 1200, 514), ("MF", 1400, 514), ("FW", 1290, 338)],
+}
+
+
+# Team Dock screen as captured in-game (full 16:9 frame, any resolution)
+TEAM_DOCK_16_9 = LayoutProfile("team_dock_16_9", 16 / 9, [
+    # Manager/coach card name plate
+    Region("manager", 0.336, 0.300, 0.445, 0.345, mode="line"),
+    # Formation label under the "FORMATION" title
+    Region("formation", 0.281, 0.606, 0.490, 0.667, mode="line"),
+    # The pitch with the 11 starters (stops before the bench column)
+    Region("pitch", 0.480, 0.210, 0.875, 0.875),
+], slots=scale_slots(TEAM_DOCK_SLOTS, 1920, 1080))
+
+PROFILES = [TEAM_DOCK_16_9]
+
+def find_profile(img):
+    """ Returns the first layout profile matching the image, None if the screen isn't known """
+    for profile in PROFILES:
+        if profile.matches(img):
+            return profile
+    return None
+
+def find_profile_size(width, height):
+    """ Same as find_profile, from the frame size only """
+    for profile in PROFILES:
+        if profile.matches_size(width, height):
+            return profile
+    return None
+
+def shift_box(bbox, offset):
+    """ Moves an EasyOCR box from crop coordinates back to frame coordinates """
+    dx, dy = offset
+    return [[int(x) + dx, int(y) + dy] for x, y in bbox]
+
+def read_regions(reader, img, profile, width_ths=0.7, lines_only=False):
+    """
+    OCRs only the profile regions and returns readtext-style results in frame coordinates,
+    so the reading order sort behaves exactly like on the full screenshot.
+    lines_only skips the regions that need text detection.
+    """
+    results = []
+    for region in profile.regions:
+        if lines_only and region.mode != "line":
+            continue
+        crop, offset = region.crop(img)
+        if crop.size == 0:
+            continue
+
+        if region.mode == "line":
+            # Known single line: skip text detection and just recognize the crop
+            found = reader.recognize(crop, detail=1)
+        else:
+            found = reader.readtext(crop, detail=1, width_ths=width_ths)
+
+        for bbox, text, confidence in found:
+            results.append((shift_box(bbox, offset), text, confidence))
+    return results
+
+def slot_points(profile, formation_id=None, merge=(0.01, 0.005)):
+    """
+    Name plate centres to read: the slots of one formation, or of every formation
+    (points closer than merge in x and y read once) when the formation isn't known.
+    """
+    if formation_id is not None:
+        return [(x, y) for _, x, y in profile.slots.get(formation_id, [])]
+
+    merge_x, merge_y = merge
+    points = []
+    for template in profile.slots.values():
+        for _, x, y in template:
+            if all(abs(x - px) > merge_x or abs(y - py) > merge_y for px, py in points):
+                points.append((x, y))
+    return points
+
+def read_slots(reader, img, profile, formation_id=None, plate=(0.11, 0.04)):
+    """
+    Recognizer-only reading of the pitch: crops a plate-sized box around every slot and
+    recognizes it as one line, no text detection needed.
+    """
+    height, width = img.shape[:2]
+    plate_w, plate_h = plate
+    results = []
+    for x, y in slot_points(profile, formation_id):
+        region = Region("slot", max(0.0, x - plate_w / 2), max(0.0, y - plate_h / 2), min(1.0, x + plate_w / 2), min(1.0, y + plate_h / 2), mode="line")
+        crop, offset = region.crop(img)
+        if crop.size == 0:
+            continue
+        for bbox, text, confidence in reader.recognize(crop, detail=1):
+            if text.strip():
+                results.append((shift_box(bbox, offset), text, confidence))
+    return results
@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+class ScanMetrics:
+    """
+    Collects timings and match counters for one scan.
+    ExactTeamScanner fills it in, report() returns it as a plain dict.
+    """
+    def __init__(self):
+        self.stages = {}
+        # Stage timed inside another one -> that stage (its time is already part of the parent's)
+        self.parents = {}
+        self.open_stages = []
+        self.counters = Counter()
+        # Single-name lookups, one observation per query
+        self.fuzzy_count = 0
+        self.fuzzy_total = 0.0
+        self.fuzzy_max = 0.0
+        # Vectorized passes, many queries per observation
+        self.batch_count = 0
+        self.batch_queries = 0
+        self.batch_total = 0.0
+
+    @contextmanager
+    def stage(self, name):
+        if self.open_stages:
+            self.parents.setdefault(name, self.open_stages[-1])
+        self.open_stages.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # Stages that run more than once (e.g. one per layout region) add up
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+            self.open_stages.pop()
+
+    def stage_path(self, name):
+        """ 'match.fuzzy_batch' for a nested stage, so flat listings don't look additive """
+        return f"{self.stage_path(self.parents[name])}.{name}" if name in self.parents else name
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def observe_fuzzy(self, seconds):
+        self.fuzzy_count += 1
+        self.fuzzy_total += seconds
+        self.fuzzy_max = max(self.fuzzy_max, seconds)
+
+    def observe_fuzzy_batch(self, queries, seconds):
+        self.batch_count += 1
+        self.batch_queries += queries
+        self.batch_total += seconds
+
+    def report(self):
+        return {
+            "stages": dict(self.stages),
+            "nested": dict(self.parents),
+            # Top-level stages only, nested ones are already counted in their parent
+            "total": sum(seconds for name, seconds in self.stages.items() if name not in self.parents),
+            "counters": dict(self.counters),
+            "fuzzy_queries": {
+                "count": self.fuzzy_count,
+                "total": self.fuzzy_total,
+                "max": self.fuzzy_max
+            },
+            "fuzzy_batch": {
+                "count": self.batch_count,
+                "queries": self.batch_queries,
+                "total": self.batch_total
+            }
+        }
+
+    def to_json(self):
+        return json.dumps(self.report())
+
+    def to_prometheus(self, prefix="inalyser_scan"):
+        report = self.report()
+        lines = [f"# TYPE {prefix}_stage_seconds gauge"]
+        for name, seconds in report["stages"].items():
+            lines.append(f'{prefix}_stage_seconds{{stage="{name}"}} {seconds:.6f}')
+        lines.append(f"# TYPE {prefix}_events gauge")
+        for name, value in report["counters"].items():
+            lines.append(f'{prefix}_events{{kind="{name}"}} {value}')
+        lines.append(f"# TYPE {prefix}_fuzzy_query_seconds summary")
+        lines.append(f"{prefix}_fuzzy_query_seconds_sum {self.fuzzy_total:.6f}")
+        lines.append(f"{prefix}_fuzzy_query_seconds_count {self.fuzzy_count}")
+        lines.append(f"# TYPE {prefix}_fuzzy_batch_seconds summary")
+        lines.append(f"{prefix}_fuzzy_batch_seconds_sum {self.batch_total:.6f}")
+        lines.append(f"{prefix}_fuzzy_batch_seconds_count {self.batch_count}")
+        lines.append(f"# TYPE {prefix}_fuzzy_batch_queries gauge")
+        lines.append(f"{prefix}_fuzzy_batch_queries {self.batch_queries}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsRegistry:
+    """
+    Process-wide totals over many scans, for a /metrics style endpoint.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.scans = 0
+        self.stage_sum = Counter()
+        self.stage_count = Counter()
+        self.counters = Counter()
+        self.fuzzy_count = 0
+        self.fuzzy_total = 0.0
+        self.batch_count = 0
+        self.batch_queries = 0
+        self.batch_total = 0.0
+
+    def record(self, metrics):
+        report = metrics.report() if isinstance(metrics, ScanMetrics) else metrics
+        with self.lock:
+            self.scans += 1
+            for name, seconds in report["stages"].items():
+                self.stage_sum[name] += seconds
+                self.stage_count[name] += 1
+            self.counters.update(report["counters"])
+            self.fuzzy_count += report["fuzzy_queries"]["count"]
+            self.fuzzy_total += report["fuzzy_queries"]["total"]
+            batch = report.get("fuzzy_batch", {})
+            self.batch_count += batch.get("count", 0)
+            self.batch_queries += batch.get("queries", 0)
+            self.batch_total += batch.get("total", 0.0)
+
+    def to_prometheus(self, prefix="inalyser"):
+        with self.lock:
+            lines = [f"# TYPE {prefix}_scans_total counter", f"{prefix}_scans_total {self.scans}"]
+            lines.append(f"# TYPE {prefix}_stage_seconds summary")
+            for name in sorted(self.stage_sum):
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {self.stage_sum[name]:.6f}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {self.stage_count[name]}')
+            lines.append(f"# TYPE {prefix}_scan_events_total counter")
+            for name in sorted(self.counters):
+                lines.append(f'{prefix}_scan_events_total{{kind="{name}"}} {self.counters[name]}')
+            lines.append(f"# TYPE {prefix}_fuzzy_query_seconds summary")
+            lines.append(f"{prefix}_fuzzy_query_seconds_sum {self.fuzzy_total:.6f}")
+            lines.append(f"{prefix}_fuzzy_query_seconds_count {self.fuzzy_count}")
+            lines.append(f"# TYPE {prefix}_fuzzy_batch_seconds summary")
+            lines.append(f"{prefix}_fuzzy_batch_seconds_sum {self.batch_total:.6f}")
+            lines.append(f"{prefix}_fuzzy_batch_seconds_count {self.batch_count}")
+            lines.append(f"# TYPE {prefix}_fuzzy_batch_queries_total counter")
+            lines.append(f"{prefix}_fuzzy_batch_queries_total {self.batch_queries}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,178 @@
+import threading
+import cv2
+import numpy as np
+
+def dhash(gray, size=8):
+    """
+    Difference hash of a grayscale image: size x size bits, one per pair of horizontally
+    adjacent pixels of the (size+1) x size thumbnail. Survives rescaling and recompression.
+    """
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def thumbnail(gray, width=640):
+    """ Kept as uint8: at 640px the name plates are still a few pixels tall per letter """
+    height = max(1, round(gray.shape[0] * width / gray.shape[1]))
+    return cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+def match_scale(reference, centre, scales, near=None, pad=6):
+    """
+    Best (score, scale, (x, y)) placement of centre resized by each scale inside reference.
+    near=(x, y) only searches pad pixels around that spot.
+    """
+    best = (-1.0, None, None)
+    for scale in scales:
+        patch = cv2.resize(centre, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+        if patch.shape[0] > reference.shape[0] or patch.shape[1] > reference.shape[1] or min(patch.shape) < 8:
+            continue
+        x0 = y0 = 0
+        area = reference
+        if near is not None:
+            x0 = min(max(0, near[0] - pad), reference.shape[1] - patch.shape[1])
+            y0 = min(max(0, near[1] - pad), reference.shape[0] - patch.shape[0])
+            area = reference[y0:y0 + patch.shape[0] + 2 * pad, x0:x0 + patch.shape[1] + 2 * pad]
+        _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(area, patch, cv2.TM_CCOEFF_NORMED))
+        if score > best[0]:
+            best = (score, scale, (x0 + x, y0 + y))
+    return best
+
+def aligned_difference(reference, other, margin=0.08, scales=np.arange(0.90, 1.101, 0.02), step=0.0025, sigma=1.0, cell=8):
+    """
+    Finds where the centre of other sits in reference (small crops and rescales move it),
+    then returns the mean absolute difference of the worst cell x cell block once aligned.
+    One changed name plate is enough to make that block stand out.
+    The scale is searched coarsely on half-size copies, then refined to step around the best one:
+    a crop shifts it by ~1%, which already leaves text edges a pixel apart. Both images are blurred
+    by sigma so what's left of the sub-pixel misalignment doesn't count.
+    """
+    reference = cv2.GaussianBlur(reference.astype(np.float32), (0, 0), sigma)
+    other = cv2.GaussianBlur(other.astype(np.float32), (0, 0), sigma)
+    mh, mw = int(other.shape[0] * margin), int(other.shape[1] * margin)
+    centre = other[mh:other.shape[0] - mh, mw:other.shape[1] - mw]
+
+    half = lambda image: cv2.resize(image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)
+    _, coarse, location = match_scale(half(reference), half(centre), scales)
+    if coarse is None:
+        return float("inf")
+    span = scales[1] - scales[0] if len(scales) > 1 else step
+    fine = np.arange(coarse - span, coarse + span + step / 2, step)
+    _, scale, (x, y) = match_scale(reference, centre, fine, near=(2 * location[0], 2 * location[1]))
+    if scale is None:
+        return float("inf")
+
+    patch = cv2.resize(centre, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    diff = np.abs(reference[y:y + patch.shape[0], x:x + patch.shape[1]] - patch)
+    blocks = cv2.resize(diff, (diff.shape[1] // cell, diff.shape[0] // cell), interpolation=cv2.INTER_AREA)
+    return float(blocks.max())
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes: a search only visits the subtrees whose
+    edge distance is within max_distance of the query's distance to their parent.
+    """
+    def __init__(self, distance=hamming):
+        self.distance = distance
+        # Node: [hash, items, {distance: child node}]
+        self.root = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, [item], {}]
+            return
+        node = self.root
+        while True:
+            d = self.distance(value, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [item], {}]
+                return
+            node = child
+
+    def search(self, value, max_distance):
+        """ Returns [(distance, item), ...] within max_distance, closest first """
+        found = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            d = self.distance(value, node[0])
+            if d <= max_distance:
+                found.extend((d, item) for item in node[1])
+            for edge, child in node[2].items():
+                if d - max_distance <= edge <= d + max_distance:
+                    stack.append(child)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+class NearDuplicateIndex:
+    """
+    Perceptual index of the screenshots already scanned, one BK-tree per scanner settings.
+    A candidate within max_distance bits of dHash is only accepted when its aligned thumbnail
+    also differs by at most max_difference (0-255) in every block: recompressed, rescaled or slightly
+    cropped copies pass (<= 24 on the test screenshots), a changed player name doesn't (>= 33).
+    """
+    def __init__(self, max_distance=4, max_difference=28.0):
+        self.max_distance = max_distance
+        self.max_difference = max_difference
+        self.trees = {}
+        # key -> (settings, hash, thumbnail), keys missing here are stale tree entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def add(self, key, settings, gray):
+        value, thumb = dhash(gray), thumbnail(gray)
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = (settings, value, thumb)
+            self.trees.setdefault(settings, BKTree()).add(value, key)
+
+    def discard(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return
+            # BK-trees can't delete, rebuild once half the tree is stale
+            settings = entry[0]
+            live = [(k, e[1]) for k, e in self.entries.items() if e[0] == settings]
+            if len(self.trees[settings]) > 2 * len(live) + 16:
+                tree = BKTree()
+                for k, value in live:
+                    tree.add(value, k)
+                self.trees[settings] = tree
+
+    def find(self, settings, gray):
+        """ Returns the key of a verified near-duplicate, or None """
+        value = dhash(gray)
+        with self.lock:
+            tree = self.trees.get(settings)
+            if tree is None:
+                return None
+            candidates = [
+                (key, self.entries[key][2]) for _, key in tree.search(value, self.max_distance)
+                if key in self.entries
+            ]
+        if not candidates:
+            return None
+
+        thumb = thumbnail(gray)
+        for key, reference in candidates:
+            if aligned_difference(reference, thumb) <= self.max_difference:
+                return key
+        return None
+
+    def __len__(self):
+        return len(self.entries)
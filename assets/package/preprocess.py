@@ -0,0 +1,139 @@
+import cv2
+import numpy as np
+
+# Quality gate: anything past these is rejected before OCR
+MIN_CONTRAST = 8.0      # grey level std, below = blank frame
+MIN_SHARPNESS = 0.03    # Laplacian variance / contrast², below = too blurred to read anything
+# Stage choice
+DARK_BRIGHTNESS = 90.0  # mean grey level, below = dark photo
+LOW_CONTRAST = 35.0
+SOFT_SHARPNESS = 0.5
+MIN_SKEW, MAX_SKEW = 0.5, 15.0  # degrees
+
+# UnusableImageError.reason -> message
+REASONS = {
+    "blank": "the image is blank (no contrast)",
+    "blurred": "the image is too blurred to read",
+}
+
+
+class UnusableImageError(ValueError):
+    """ Raised by the quality gate, before any OCR is run. reason is a REASONS key """
+    def __init__(self, reason, quality):
+        # Both go to args so the error survives pickling (server.py raises it in a worker process)
+        super().__init__(reason, quality)
+        self.reason = reason
+        self.quality = quality
+
+    def __str__(self):
+        return f"Unusable screenshot: {REASONS[self.reason]}"
+
+
+class Quality:
+    """ Cheap image statistics, measured on a small copy of the frame """
+    __slots__ = ('brightness', 'contrast', 'sharpness', 'skew')
+
+    def __init__(self, brightness, contrast, sharpness, skew):
+        self.brightness = brightness
+        self.contrast = contrast
+        # Laplacian variance normalized by the contrast, so a dark but sharp photo isn't "blurred"
+        self.sharpness = sharpness
+        # Median angle of the near-horizontal lines (degrees), 0.0 if none were found
+        self.skew = skew
+
+    def to_dict(self):
+        return {field: round(getattr(self, field), 3) for field in self.__slots__}
+
+
+def measure_quality(gray, width=480):
+    """ Takes a few milliseconds at any resolution: everything is measured on a width px copy """
+    height = max(1, round(gray.shape[0] * width / gray.shape[1]))
+    small = cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+
+    mean, std = cv2.meanStdDev(small)
+    brightness, contrast = float(mean[0, 0]), float(std[0, 0])
+    laplacian = cv2.Laplacian(small, cv2.CV_32F).var()
+    sharpness = float(laplacian) / max(contrast, 1.0) ** 2
+
+    # Near-horizontal lines only (UI panels, name plates), strongest first
+    skew = 0.0
+    edges = cv2.Canny(small, 50, 150)
+    lines = cv2.HoughLines(
+        edges, 1, np.pi / 720, width // 4,
+        min_theta=np.radians(90 - MAX_SKEW), max_theta=np.radians(90 + MAX_SKEW)
+    )
+    if lines is not None:
+        skew = float(np.median(np.degrees(lines[:20, 0, 1]) - 90))
+    return Quality(brightness, contrast, sharpness, skew)
+
+def check_quality(quality):
+    """ Raises UnusableImageError if OCR can't get anything useful out of the frame """
+    if quality.contrast < MIN_CONTRAST:
+        raise UnusableImageError("blank", quality)
+    if quality.sharpness < MIN_SHARPNESS:
+        raise UnusableImageError("blurred", quality)
+
+
+STAGES = {}
+
+def stage(name):
+    """ Registers a preprocessing stage: func(gray, quality, **options) -> gray """
+    def register(func):
+        STAGES[name] = func
+        return func
+    return register
+
+@stage("deskew")
+def deskew(gray, quality):
+    height, width = gray.shape
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), quality.skew, 1.0)
+    return cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+@stage("contrast")
+def shift_contrast(gray, quality, alpha=1, beta=-50):
+    """ The original fixed preprocessing, tuned for clean game screenshots """
+    return cv2.convertScaleAbs(gray, alpha=alpha, beta=beta)
+
+@stage("clahe")
+def clahe(gray, quality, clip_limit=2.0, grid=8):
+    """ Local histogram equalization, brings dark or washed-out text back up """
+    return cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(grid, grid)).apply(gray)
+
+@stage("sharpen")
+def sharpen(gray, quality, amount=1.0, sigma=2.0):
+    """ Unsharp mask """
+    blurred = cv2.GaussianBlur(gray, (0, 0), sigma)
+    return cv2.addWeighted(gray, 1 + amount, blurred, -amount, 0)
+
+@stage("threshold")
+def adaptive_threshold(gray, quality, block=31, offset=10):
+    """
+    Binarizes against the local mean, for glare and uneven lighting.
+    Never chosen automatically (game UIs have too many big flat panels to tell glare apart),
+    add it to ExactTeamScanner.preprocess_stages for photos of a screen.
+    """
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block, offset)
+
+def choose_stages(quality):
+    """
+    Stages for one frame. A clean screenshot gets exactly the original contrast shift,
+    the other stages only come in when the measurements call for them.
+    """
+    stages = []
+    if MIN_SKEW <= abs(quality.skew) < MAX_SKEW:
+        stages.append("deskew")
+    if quality.brightness < DARK_BRIGHTNESS or quality.contrast < LOW_CONTRAST:
+        # The -50 shift would crush a dark frame, equalize it instead
+        stages.append("clahe")
+    else:
+        stages.append("contrast")
+    if quality.sharpness < SOFT_SHARPNESS:
+        stages.append("sharpen")
+    return stages
+
+def run_stages(gray, quality, stages, options=None):
+    """ options: {stage name: keyword arguments} """
+    options = options or {}
+    for name in stages:
+        gray = STAGES[name](gray, quality, **options.get(name, {}))
+    return gray
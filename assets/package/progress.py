@@ -0,0 +1,56 @@
+import time
+from collections import deque
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+class ProgressEvent:
+    __slots__ = ('level', 'message', 'time')
+
+    def __init__(self, level, message):
+        self.level = level
+        self.message = message
+        self.time = time.time()
+
+    def __str__(self):
+        return self.message
+
+
+class ProgressChannel:
+    """
+    Buffered progress events for a scan.
+    Events below the channel level are dropped right away (so per-token tracing is free when off),
+    the rest go into a bounded ring buffer that's pushed to the sink at most every flush_interval seconds.
+    Without a sink, events are printed to the console as they come.
+    """
+    def __init__(self, sink=None, level="info", maxlen=200, flush_interval=0.25):
+        self.sink = sink
+        self.level = LEVELS[level]
+        self.events = deque(maxlen=maxlen)
+        self.flush_interval = flush_interval
+        self.last_flush = 0.0
+        self.pending = False
+
+    def enabled(self, level):
+        return LEVELS[level] >= self.level
+
+    def emit(self, message, level="info"):
+        if not self.enabled(level):
+            return
+        event = ProgressEvent(level, str(message))
+
+        if self.sink is None:
+            print(event.message)
+            return
+
+        self.events.append(event)
+        self.pending = True
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """ Sends the buffered events to the sink, if anything changed since the last flush """
+        if self.sink is None or not self.pending:
+            return
+        self.pending = False
+        self.last_flush = time.monotonic()
+        self.sink(list(self.events))
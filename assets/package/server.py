@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures.process import BrokenProcessPool
+from assets.package.batch import make_pool, DEFAULT_DB
+from assets.package.metrics import MetricsRegistry
+
+MAX_BODY = 10 * 1024 * 1024
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 413: "Payload Too Large", 422: "Unprocessable Entity",
+    429: "Too Many Requests", 500: "Internal Server Error", 503: "Service Unavailable",
+    504: "Gateway Timeout"
+}
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def scan_bytes(image_bytes, csv_path, use_layout, recognizer_only=False):
+    """
+    Runs in a worker process (which already holds the OCR reader).
+    Returns the export_json payload (None if no players) and the scan metrics.
+    """
+    from assets.package.detector import ExactTeamScanner
+    from assets.package.cache import get_result_cache
+
+    scanner = ExactTeamScanner(csv_path, image_bytes, use_layout=use_layout, recognizer_only=recognizer_only)
+    scanner.set_callback(lambda events: None)
+    data = scanner.scan_export(cache=get_result_cache())
+    return data, scanner.metrics.report()
+
+
+class ScanService:
+    """
+    Fixed pool of worker processes, each with its own OCR reader.
+    At most workers + queue_size scans are accepted at once, anything beyond that gets a 429.
+    """
+    def __init__(self, csv_path=DEFAULT_DB, workers=None, queue_size=16, timeout=60.0, use_layout=False, threads=None, recognizer_only=False):
+        self.csv_path = csv_path
+        self.workers = workers or os.cpu_count() or 1
+        self.capacity = self.workers + queue_size
+        self.timeout = timeout
+        self.use_layout = use_layout
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.recognizer_only = recognizer_only
+
+        self.pool = self.new_pool()
+        self.in_flight = 0
+        self.stats = {"accepted": 0, "rejected": 0, "timeouts": 0, "errors": 0}
+        self.metrics = MetricsRegistry()
+
+    def new_pool(self):
+        # Workers fork from this process and inherit its loaded model (see share_model)
+        return make_pool(self.workers, self.threads, False, self.recognizer_only)
+
+    async def scan(self, image_bytes):
+        if self.in_flight >= self.capacity:
+            self.stats["rejected"] += 1
+            raise HTTPError(429, "Scan queue is full, try again later")
+
+        self.in_flight += 1
+        self.stats["accepted"] += 1
+        loop = asyncio.get_running_loop()
+        pool, job = self.pool, None
+        try:
+            job = pool.submit(scan_bytes, image_bytes, self.csv_path, self.use_layout, self.recognizer_only)
+            # The slot is only given back once the worker is done with the scan (or it's cancelled before starting),
+            # a scan the client stopped waiting for still takes up a worker
+            job.add_done_callback(lambda _: loop.call_soon_threadsafe(self.release))
+            # The worker keeps going after a timeout, but the client gets its answer
+            data, report = await asyncio.wait_for(asyncio.wrap_future(job), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            raise HTTPError(504, f"Scan took longer than {self.timeout:.0f}s") from None
+        except BrokenProcessPool:
+            # A dead worker breaks the whole pool, start a fresh one for the next requests
+            self.stats["errors"] += 1
+            if pool is self.pool:
+                # Only once, even if several requests were waiting on the broken pool
+                pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = self.new_pool()
+            raise HTTPError(503, "Scan worker crashed") from None
+        except ValueError as e:
+            # Undecodable image, or rejected by the quality gate
+            self.stats["errors"] += 1
+            raise HTTPError(400, str(e)) from None
+        except Exception as e:
+            self.stats["errors"] += 1
+            raise HTTPError(500, f"{type(e).__name__}: {e}") from None
+        finally:
+            if job is None:
+                self.in_flight -= 1
+
+        self.metrics.record(report)
+        if data is None:
+            raise HTTPError(422, "No players found. Try a clearer screenshot.")
+        return data
+
+    def release(self):
+        self.in_flight -= 1
+
+    def prometheus(self):
+        lines = [
+            "# TYPE inalyser_queue_in_flight gauge",
+            f"inalyser_queue_in_flight {self.in_flight}",
+            "# TYPE inalyser_requests_total counter"
+        ]
+        lines += [f'inalyser_requests_total{{outcome="{name}"}} {value}' for name, value in self.stats.items()]
+        return "\n".join(lines) + "\n" + self.metrics.to_prometheus()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def read_request(reader):
+    """ Minimal HTTP/1.1 request parser: request line, headers and a Content-Length body """
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line") from None
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length header") from None
+    if length < 0:
+        raise HTTPError(400, "Invalid Content-Length header")
+    if length > MAX_BODY:
+        raise HTTPError(413, f"Image is larger than {MAX_BODY // 2**20} MB")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+def write_response(writer, status, body, content_type="application/json"):
+    if not isinstance(body, bytes):
+        body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    if status == 429:
+        head = head.replace("\r\n\r\n", "\r\nRetry-After: 5\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+
+
+async def handle(service, reader, writer):
+    try:
+        request = await asyncio.wait_for(read_request(reader), 30)
+        if request is None:
+            writer.close()
+            return
+        method, path, headers, body = request
+
+        if path == "/scan":
+            if method != "POST":
+                raise HTTPError(405, "Use POST with the image bytes as the body")
+            if not body:
+                raise HTTPError(400, "Empty body, send the screenshot bytes")
+            write_response(writer, 200, await service.scan(body))
+        elif path == "/health" and method == "GET":
+            write_response(writer, 200, {"status": "ok", "in_flight": service.in_flight, **service.stats})
+        elif path == "/metrics" and method == "GET":
+            write_response(writer, 200, service.prometheus().encode("utf-8"), "text/plain; version=0.0.4")
+        else:
+            raise HTTPError(404, f"Unknown route: {method} {path}")
+    except HTTPError as e:
+        write_response(writer, e.status, {"error": e.message})
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+        write_response(writer, 408, {"error": "Request was not received in time"})
+    except ConnectionError:
+        writer.close()
+        return
+    except Exception as e:
+        # Anything unexpected still gets an answer, and the connection is closed below
+        write_response(writer, 500, {"error": f"{type(e).__name__}: {e}"})
+    try:
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(lambda r, w: handle(service, r, w), host, port)
+    print(f"⚡ Ina-lyser scan service on http://{host}:{port} ({service.workers} workers)")
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP scan service: POST /scan with the screenshot bytes.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--db", default=DEFAULT_DB, help="Path to the player database CSV")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--queue", type=int, default=16, help="Scans allowed to wait for a worker before answering 429")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds before a scan answers 504")
+    parser.add_argument("--layout", action="store_true", help="Only OCR the name plates and formation label of known screen layouts")
+    parser.add_argument("--threads", type=int, default=None, help="Torch threads per worker (default: CPU count / workers)")
+    parser.add_argument("--recognizer-only", action="store_true", help="Skip the text detector and read the name plates of known screen layouts")
+    args = parser.parse_args(argv)
+
+    service = ScanService(args.db, args.workers, args.queue, args.timeout, args.layout, args.threads, args.recognizer_only)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
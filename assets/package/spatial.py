@@ -0,0 +1,94 @@
+from statistics import median
+
+def box_center(bbox):
+    xs = [x for x, _ in bbox]
+    ys = [y for _, y in bbox]
+    return (min(xs) + max(xs)) / 2, (min(ys) + max(ys)) / 2
+
+def box_height(bbox):
+    ys = [y for _, y in bbox]
+    return max(ys) - min(ys)
+
+def reading_order(results, row_gap=0.5):
+    """
+    Sorts readtext results line by line, left to right.
+    Rows are clustered from the box centres: a box starts a new row when it sits more than
+    row_gap x the median text height below the current row, so it works at any resolution.
+    """
+    if not results:
+        return []
+    gap = row_gap * max(1.0, median(box_height(r[0]) for r in results))
+
+    by_y = sorted(results, key=lambda r: box_center(r[0])[1])
+    rows, row, row_y = [], [], None
+    for result in by_y:
+        y = box_center(result[0])[1]
+        if row and y - row_y > gap:
+            rows.append(row)
+            row = []
+        row.append(result)
+        # Running mean, so a slightly tilted line stays one row
+        row_y = sum(box_center(r[0])[1] for r in row) / len(row)
+    rows.append(row)
+
+    return [result for row in rows for result in sorted(row, key=lambda r: box_center(r[0])[0])]
+
+def inside(point, box, margin=0.0):
+    x, y = point
+    x0, y0, x1, y1 = box
+    return x0 - margin <= x <= x1 + margin and y0 - margin <= y <= y1 + margin
+
+def assign_slots(points, template, max_distance=0.08):
+    """
+    Matches points (frame fractions) to template slots, closest pairs first.
+    Returns {point index: slot index}, points further than max_distance from any free slot stay out.
+    """
+    pairs = sorted(
+        ((px - sx) ** 2 + (py - sy) ** 2, p, s)
+        for p, (px, py) in enumerate(points)
+        for s, (_, sx, sy) in enumerate(template)
+    )
+    taken_points, taken_slots, assignment = set(), set(), {}
+    for dist2, p, s in pairs:
+        if dist2 > max_distance ** 2:
+            break
+        if p in taken_points or s in taken_slots:
+            continue
+        assignment[p] = s
+        taken_points.add(p)
+        taken_slots.add(s)
+    return assignment
+
+def place_team(players, positions, profile, formation_id):
+    """
+    Uses where each name was read to find the coach (manager panel) and each starter's slot.
+    positions maps player id -> (x, y) frame fractions.
+    Returns (coach or None, [(role, player), ...], number of players placed, total squared distance
+    to the slots), or None when the screen or formation has no template, or a player has no position.
+    Starters come in slot order, the ones that fit no slot follow in reading order with role None.
+    """
+    template = profile.slots.get(formation_id) if profile else None
+    manager = profile.region("manager") if profile else None
+    if not template or manager is None or any(p['id'] not in positions for p in players):
+        return None
+
+    coach = None
+    starters = []
+    for player in players:
+        point = positions[player['id']]
+        if coach is None and inside(point, manager.box, margin=0.02):
+            coach = player
+        else:
+            starters.append(player)
+
+    points = [positions[p['id']] for p in starters]
+    assignment = assign_slots(points, template)
+    by_slot = sorted((slot, index) for index, slot in assignment.items())
+    team = [(template[slot][0], starters[index]) for slot, index in by_slot]
+    # A partly recognised screen still exports everyone, like the reading-order path did
+    team += [(None, player) for index, player in enumerate(starters) if index not in assignment]
+    cost = sum(
+        (points[index][0] - template[slot][1]) ** 2 + (points[index][1] - template[slot][2]) ** 2
+        for slot, index in by_slot
+    )
+    return coach, team, len(by_slot), cost
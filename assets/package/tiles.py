@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+
+def make_tiles(shape, tile_size=1280, overlap=256):
+    """
+    Splits an image of the given shape into overlapping (x0, y0, x1, y1) tiles.
+    The overlap should be wider than the longest text box so every name is whole in at least one tile.
+    """
+    height, width = shape[:2]
+    step = max(1, tile_size - overlap)
+
+    def starts(size):
+        if size <= tile_size:
+            return [0]
+        positions = list(range(0, size - tile_size, step))
+        # Last tile is flush with the edge
+        positions.append(size - tile_size)
+        return positions
+
+    return [
+        (x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height))
+        for y0 in starts(height)
+        for x0 in starts(width)
+    ]
+
+def shift_result(result, dx, dy, scale=1.0):
+    """ Moves a readtext result from tile to frame coordinates (and rescales it) """
+    bbox, text, confidence = result
+    return ([[int((x + dx) * scale), int((y + dy) * scale)] for x, y in bbox], text, confidence)
+
+def bounds(bbox):
+    xs = [x for x, _ in bbox]
+    ys = [y for _, y in bbox]
+    return min(xs), min(ys), max(xs), max(ys)
+
+def area(box):
+    x0, y0, x1, y1 = box
+    return (x1 - x0) * (y1 - y0)
+
+def overlap_ratio(a, b):
+    """ Intersection area over the area of the smaller box """
+    ax0, ay0, ax1, ay1 = a
+    bx0, by0, bx1, by1 = b
+    inter = max(0, min(ax1, bx1) - max(ax0, bx0)) * max(0, min(ay1, by1) - max(ay0, by0))
+    smaller = min((ax1 - ax0) * (ay1 - ay0), (bx1 - bx0) * (by1 - by0))
+    return inter / smaller if smaller > 0 else 0.0
+
+def merge_results(results, threshold=0.5):
+    """
+    De-duplicates the reads of neighbouring tiles.
+    When two boxes mostly cover each other, the bigger one wins (the other is usually the same text
+    cut by a tile edge), then the more confident one.
+    """
+    ranked = sorted(results, key=lambda r: (area(bounds(r[0])), r[2]), reverse=True)
+    kept, kept_bounds = [], []
+    for result in ranked:
+        box = bounds(result[0])
+        if any(overlap_ratio(box, other) >= threshold for other in kept_bounds):
+            continue
+        kept.append(result)
+        kept_bounds.append(box)
+    return kept
+
+def read_tiles(reader, img, tile_size=1280, overlap=256, workers=2, scale=1.0, **readtext_args):
+    """
+    Runs reader.readtext on overlapping tiles in a thread pool (PyTorch releases the GIL
+    while it computes), then merges the boxes back into frame coordinates times scale.
+    """
+    tiles = make_tiles(img.shape, tile_size, overlap)
+
+    def read(tile):
+        x0, y0, x1, y1 = tile
+        crop = img[y0:y1, x0:x1]
+        return [shift_result(r, x0, y0, scale) for r in reader.readtext(crop, **readtext_args)]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(tiles))) as pool:
+        reads = [r for tile_results in pool.map(read, tiles) for r in tile_results]
+    return merge_results(reads)
@@ -0,0 +1,95 @@
+import re
+
+# Everything except the characters that can appear in names and formations
+# ADD "-" IF FORMATION GLITCHES OUT
+UNWANTED_CHARS = re.compile(r"[^A-Za-z 1-6]+")
+
+# Formation digits as the OCR reads them, mapped to the id used by detect_formation
+# WITH DASHES IF FORMATION GLITCHES OUT: "4-4-2", "3-5-2", ...
+FORMATION_CODES = {"442": 0, "352": 1, "433": 2, "451": 3, "361": 4, "541": 5}
+
+def clean_token(text):
+    """ Keeps only the characters that can appear in names and formations """
+    return UNWANTED_CHARS.sub("", text).strip()
+
+def formation_code(text):
+    """
+    Returns the formation id found in a cleaned token, or None.
+    If several codes appear, the one listed last in FORMATION_CODES wins (like the old loop).
+    """
+    best = None
+    for k in range(len(text) - 2):
+        code_id = FORMATION_CODES.get(text[k:k+3])
+        if code_id is not None and (best is None or code_id > best):
+            best = code_id
+    return best
+
+
+class Token:
+    __slots__ = ('raw', 'text', 'key', 'next_key', 'formation_id', 'box')
+
+    def __init__(self, raw, text, key, formation_id, box=None):
+        self.raw = raw
+        # Cleaned text (formation labels are kept with their case)
+        self.text = text
+        # Lowercased cleaned text, the name lookup key
+        self.key = key
+        # Lowercased raw text, used as the second half of a stitched name
+        self.next_key = raw.lower()
+        self.formation_id = formation_id
+        # EasyOCR box (4 corners) the text was read from
+        self.box = box
+
+
+class TokenStream:
+    """
+    The OCR strings of one screenshot, normalized and classified once, in reading order.
+    The matcher peeks at the current token (and the next one for stitched names) and advances
+    by exactly the number of tokens it consumed.
+    """
+    def __init__(self, texts, boxes=None):
+        self.tokens = []
+        boxes = boxes if boxes is not None else [None] * len(texts)
+        for raw, box in zip(texts, boxes):
+            raw = raw.strip()
+            text = clean_token(raw)
+            self.tokens.append(Token(raw, text, text.lower(), formation_code(text), box))
+        self.position = 0
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __bool__(self):
+        return self.position < len(self.tokens)
+
+    def peek(self, offset=0):
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def advance(self, count=1):
+        self.position += count
+
+    def stitched(self):
+        """ Current key + next raw text, or None on the last token """
+        following = self.peek(1)
+        if following is None:
+            return None
+        return f"{self.peek().key} {following.next_key}"
+
+    def stitched_raw(self):
+        """ Current + next text as read (accents kept), or None on the last token """
+        following = self.peek(1)
+        if following is None:
+            return None
+        return f"{self.peek().raw} {following.raw}"
+
+    @classmethod
+    def from_results(cls, results):
+        """ From EasyOCR (bbox, text, confidence) results """
+        return cls([r[1] for r in results], [r[0] for r in results])
+
+    def queries(self):
+        """ Every single and stitched string the matcher may look up """
+        singles = [token.key for token in self.tokens]
+        pairs = [f"{singles[k]} {self.tokens[k+1].next_key}" for k in range(len(self.tokens) - 1)]
+        return singles + pairs
@@ -0,0 +1,129 @@
+import argparse
+import hashlib
+import os
+import sys
+import unicodedata
+
+VARIANTS_VERSION = 1
+
+# Characters OCR mixes up, folded to one form on both sides of the lookup
+CONFUSIONS = str.maketrans({
+    "0": "o",
+    "1": "l", "|": "l", "!": "l", "i": "l",
+    "5": "s",
+    "8": "b",
+})
+# Dropped entirely: spaces (OCR often merges or splits words), hyphens, apostrophes, dots
+DROPPED = " -'’‘`.,_"
+
+def normalize(text):
+    """
+    Canonical form of a name for the variant table: no diacritics, lowercase,
+    OCR look-alikes folded and separators dropped. 'Shûya Gôenji', 'shuya goenji'
+    and 'ShuyaGoenj1' all give the same key.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = text.lower().translate(CONFUSIONS)
+    return "".join(char for char in text if char not in DROPPED)
+
+def name_variants(name):
+    """ Keys for one spelling: as written and with the first and last word swapped """
+    words = name.split()
+    yield normalize(name)
+    if len(words) >= 2:
+        yield normalize(" ".join(words[1:] + words[:1]))
+        yield normalize(" ".join(words[-1:] + words[:-1]))
+
+def build_variants(lookup):
+    """
+    Builds {variant key: exact lookup name} from the catalogue lookup (lowercased name -> player).
+    Keys reached from names of different players are collisions: they're left out
+    (the fuzzy matcher decides those) and returned separately.
+    """
+    # key -> {player id: name it came from}
+    sources = {}
+    for name, player in lookup.items():
+        for key in name_variants(name):
+            if key and key not in lookup:
+                sources.setdefault(key, {}).setdefault(player['id'], name)
+
+    table, collisions = {}, {}
+    for key, owners in sources.items():
+        if len(owners) == 1:
+            table[key] = next(iter(owners.values()))
+        else:
+            collisions[key] = sorted(owners.values())
+    return table, collisions
+
+def patch_variants(table, lookup, added, removed):
+    """
+    Updates a variant table in place after names were added to / removed from lookup.
+    A new key that's already taken by another player is dropped like in build_variants
+    (keys that collided before aren't tracked, a full rebuild settles those).
+    """
+    removed = set(removed)
+    if removed:
+        for key in [key for key, name in table.items() if name in removed]:
+            del table[key]
+    for name in added:
+        player = lookup[name]
+        for key in name_variants(name):
+            if not key or key in lookup:
+                continue
+            owner = table.get(key)
+            if owner is None:
+                table[key] = name
+            elif lookup[owner].id != player.id:
+                del table[key]
+    return table
+
+def csv_digest(csv_path):
+    with open(csv_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def default_path(csv_path):
+    return os.path.splitext(csv_path)[0] + ".variants.tsv"
+
+def write_table(path, table, digest):
+    """ One 'key<TAB>name' line per variant, sorted, under a header tying it to the CSV it was built from """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(f"# variants v{VARIANTS_VERSION} sha1={digest}\n")
+        for key in sorted(table):
+            f.write(f"{key}\t{table[key]}\n")
+    os.replace(tmp_path, path)
+
+def read_table(path, digest):
+    """ Returns the stored table, or None if it's missing, outdated or from another CSV """
+    try:
+        with open(path, encoding='utf-8') as f:
+            header = f.readline().split()
+            if header != ["#", "variants", f"v{VARIANTS_VERSION}", f"sha1={digest}"]:
+                return None
+            return dict(line.rstrip("\n").split("\t", 1) for line in f)
+    except (OSError, ValueError):
+        return None
+
+def main(argv=None):
+    from assets.package.catalogue import PlayerCatalogue
+
+    parser = argparse.ArgumentParser(description="Build the name variant table next to the player database.")
+    parser.add_argument("csv", nargs="?", default="assets/players/db.csv", help="Path to the player database CSV")
+    parser.add_argument("-o", "--output", default=None, help="Output file (default: <csv name>.variants.tsv)")
+    args = parser.parse_args(argv)
+
+    catalogue = PlayerCatalogue(PlayerCatalogue.read_csv(args.csv))
+    table, collisions = build_variants(catalogue.lookup)
+    output = args.output or default_path(args.csv)
+    write_table(output, table, csv_digest(args.csv))
+
+    print(f"✅ {len(table)} variants for {len(catalogue.lookup)} names written to {output}")
+    if collisions:
+        print(f"⚠️ {len(collisions)} ambiguous variants left to the fuzzy matcher, e.g.:")
+        for key in sorted(collisions)[:10]:
+            print(f"   {key}: {', '.join(sorted(collisions[key]))}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import difflib
+from collections import Counter
+import numpy as np
+
+class VectorMatcher:
+    """
+    Scores many OCR strings against every name at once.
+    Names and queries become trigram count vectors; one sparse product (done with np.bincount)
+    gives the cosine similarity of every (query, name) pair. The top-k names per query are then
+    re-scored with difflib's ratio so the confidence means the same thing as the 0.85 cutoff.
+    """
+    def __init__(self, names, chunk_size=64):
+        self.names = list(names)
+        self.chunk_size = chunk_size
+
+        vocab = {}
+        postings = {}
+        for idx, name in enumerate(self.names):
+            for gram, count in self.trigrams(name).items():
+                gram_id = vocab.setdefault(gram, len(vocab))
+                postings.setdefault(gram_id, []).append((idx, count))
+
+        # CSR layout: gram_id -> slice of (name index, count)
+        self.vocab = vocab
+        self.indptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        name_ids, weights = [], []
+        for gram_id in range(len(vocab)):
+            entries = postings[gram_id]
+            self.indptr[gram_id + 1] = self.indptr[gram_id] + len(entries)
+            name_ids.extend(idx for idx, _ in entries)
+            weights.extend(count for _, count in entries)
+        self.name_ids = np.asarray(name_ids, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=np.float32)
+
+        norms = np.bincount(self.name_ids, self.weights ** 2, minlength=len(self.names))
+        self.norms = np.sqrt(np.maximum(norms, 1e-12)).astype(np.float32)
+
+    @staticmethod
+    def trigrams(text):
+        # Padded so short names and word boundaries still produce grams
+        padded = f"  {text} "
+        return Counter(padded[k:k+3] for k in range(len(padded) - 2))
+
+    def similarity(self, queries):
+        """ Cosine similarity matrix, shape (len(queries), len(names)) """
+        rows, gram_ids, q_weights = [], [], []
+        q_norms = np.zeros(len(queries), dtype=np.float32)
+        for row, query in enumerate(queries):
+            grams = self.trigrams(query)
+            q_norms[row] = np.sqrt(sum(c * c for c in grams.values()))
+            for gram, count in grams.items():
+                gram_id = self.vocab.get(gram)
+                if gram_id is not None:
+                    rows.append(row)
+                    gram_ids.append(gram_id)
+                    q_weights.append(count)
+
+        scores = np.zeros(len(queries) * len(self.names), dtype=np.float32)
+        if gram_ids:
+            gram_ids = np.asarray(gram_ids, dtype=np.int64)
+            starts = self.indptr[gram_ids]
+            lengths = self.indptr[gram_ids + 1] - starts
+
+            # Expand every (query, gram) pair into all the postings of that gram
+            owners = np.repeat(np.arange(len(gram_ids)), lengths)
+            offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            positions = starts[owners] + offsets
+
+            flat = np.asarray(rows, dtype=np.int64)[owners] * len(self.names) + self.name_ids[positions]
+            contrib = np.asarray(q_weights, dtype=np.float32)[owners] * self.weights[positions]
+            scores = np.bincount(flat, contrib, minlength=scores.size).astype(np.float32)
+
+        scores = scores.reshape(len(queries), len(self.names))
+        return scores / (np.maximum(q_norms, 1e-12)[:, None] * self.norms[None, :])
+
+    def top_k(self, queries, k=5, cutoff=0.0, excluded=None):
+        """
+        Returns, for each query, up to k (name, score) pairs sorted best first.
+        Scores are difflib ratios (1.0 = identical), anything under cutoff is dropped.
+        excluded is an array of name indices that are never returned.
+        """
+        results = []
+        k = min(k, len(self.names))
+        if k == 0:
+            return [[] for _ in queries]
+        skipped = set(excluded.tolist()) if excluded is not None else ()
+        for start in range(0, len(queries), self.chunk_size):
+            chunk = queries[start:start + self.chunk_size]
+            sims = self.similarity(chunk)
+            if excluded is not None and len(excluded):
+                sims[:, excluded] = -1.0
+            best = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+
+            for query, row in zip(chunk, best):
+                matcher = difflib.SequenceMatcher()
+                matcher.set_seq2(query)
+                scored = []
+                for idx in row:
+                    if idx in skipped:
+                        continue
+                    name = self.names[idx]
+                    matcher.set_seq1(name)
+                    if matcher.real_quick_ratio() >= cutoff and matcher.quick_ratio() >= cutoff:
+                        ratio = matcher.ratio()
+                        if ratio >= cutoff:
+                            scored.append((ratio, name))
+                # Same tie-break as get_close_matches
+                scored.sort(reverse=True)
+                results.append([(name, ratio) for ratio, name in scored])
+        return results
+
+
+class LayeredVectorMatcher:
+    """
+    A VectorMatcher plus the names added and removed since it was built (see LayeredFuzzyIndex).
+    Removed names are masked out of the base scores, added ones are scored by a small matcher of
+    their own, and the two top-k lists are merged.
+    """
+    def __init__(self, base, added, removed):
+        self.base = base
+        self.added = VectorMatcher(added) if added else None
+        removed = set(removed)
+        self.excluded = np.asarray([idx for idx, name in enumerate(base.names) if name in removed], dtype=np.int64)
+
+    def top_k(self, queries, k=5, cutoff=0.0):
+        results = self.base.top_k(queries, k, cutoff, excluded=self.excluded)
+        if self.added is None:
+            return results
+        merged = []
+        for base, added in zip(results, self.added.top_k(queries, k, cutoff)):
+            # Same order as VectorMatcher.top_k: best ratio first, ties by name
+            pairs = sorted(base + added, key=lambda pair: (pair[1], pair[0]), reverse=True)
+            merged.append(pairs[:k])
+        return merged
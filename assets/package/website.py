@@ -1,9 +1,9 @@
 import streamlit as st
 import os
-import tempfile
 import json
 # Local Imports
-from assets.package.detector import ExactTeamScanner
+from assets.package.cache import get_result_cache
+from assets.package.jobs import get_executor, QueueFullError
 from assets.package.lang import LangDict
 
 class WebsiteBuilder:
@@ -13,6 +13,92 @@ class WebsiteBuilder:
         self.cover_img_path = "assets/img/cover.jpg"
         self.example_img_path = "assets/img/example.png"
 
+    @staticmethod
+    def render_logs(placeholder, events):
+        """ Scrollable console with the scanner's buffered events, newest first """
+        log_content = "".join([f"<div>{event.message}</div>" for event in reversed(events)])
+        placeholder.markdown(
+            f"""
+            <div style="
+                height: 100px; 
+                overflow-y: auto;
+                display: flex;                  /* Enable Flexbox */
+                flex-direction: column-reverse; /* Render bottom-to-top */
+                background-color: #000000; 
+                color: #FFFFFF; 
+                padding: 15px;
+                margin: 15px;
+                border-radius: 5px; 
+                border: 1px solid #d6d6d6; 
+                font-family: monospace;
+                font-size: 15px;
+                line-height: 1.5;
+            ">
+                {log_content}
+            </div>
+            """, 
+            unsafe_allow_html=True
+        )
+
+    def show_job(self, job_id, t):
+        """
+        Shows a scan job. While it's queued or running, only this fragment reruns (twice a second)
+        to show the logs and the team found so far, the rest of the page stays idle.
+        """
+        job = get_executor().get(job_id)
+        if job is None:
+            # Forgotten by the executor (finished a long time ago)
+            return
+
+        polling = job.active
+
+        @st.fragment(run_every=0.5 if polling else None)
+        def render():
+            state = job.snapshot()
+            if polling and state["status"] in ("done", "failed"):
+                # Finished: rerun the page once so the fragment stops polling
+                st.rerun()
+            if state["logs"]:
+                self.render_logs(st.empty(), state["logs"])
+
+            if state["status"] in ("queued", "running"):
+                found = [event.player['name'] for event in state["events"] if event.kind == "player"]
+                formations = [event.layout[0] for event in state["events"] if event.kind == "formation"]
+                if state["status"] == "queued":
+                    st.info(t["queued"])
+                else:
+                    st.markdown(
+                        f"⏳ {t['spinner']} **{t['partial_team']}** ({len(found)}){' · ' + formations[-1] if formations else ''}: "
+                        + ", ".join(found)
+                    )
+                return
+
+            if state["status"] == "failed":
+                # Rejected by the quality gate (preprocess.UnusableImageError), before any OCR
+                if state["reason"] is not None:
+                    st.warning(t[f"unusable_{state['reason']}"])
+                else:
+                    st.error(f"An error occurred: {state['error']}")
+                return
+
+            # Display Results
+            export_data = state["result"]
+            if export_data is not None:
+                st.json(export_data)
+
+                # Download Button
+                json_str = json.dumps(export_data, indent=4, ensure_ascii=False)
+                st.download_button(
+                    label=t["download_label"],
+                    data=json_str,
+                    file_name="team_export.json",
+                    mime="application/json"
+                )
+            else:
+                st.warning(t["no_players"])
+
+        render()
+
     def create_page(self):
         
         st.set_page_config(page_title=self.title, page_icon="⚡")
@@ -107,78 +193,18 @@ class WebsiteBuilder:
                 st.image(uploaded_file, caption=t["uploaded_caption"], width='stretch')
 
                 if st.button(t["scan_button"]):
-                    log_placeholder = st.empty()
-                    log_history = []
-                    
-                    # Define the callback function
-                    def update_logs(message):
-                        
-                        log_history.append(str(message))
-                        # Reverses the list to show newest message first
-                        reversed_logs = log_history[::-1]
-                        log_content = "".join([f"<div>{line}</div>" for line in reversed_logs])
-                    
-                        # Render a scrollable DIV
-                        log_placeholder.markdown(
-                            f"""
-                            <div style="
-                                height: 100px; 
-                                overflow-y: auto;
-                                display: flex;                  /* Enable Flexbox */
-                                flex-direction: column-reverse; /* Render bottom-to-top */
-                                background-color: #000000; 
-                                color: #FFFFFF; 
-                                padding: 15px;
-                                margin: 15px;
-                                border-radius: 5px; 
-                                border: 1px solid #d6d6d6; 
-                                font-family: monospace;
-                                font-size: 15px;
-                                line-height: 1.5;
-                            ">
-                                {log_content}
-                            </div>
-                            """, 
-                            unsafe_allow_html=True
-                        )
-                    # Create a placeholder for the logs
-                    with st.spinner(t["spinner"]):
-                        try:
-                            # Save Streamlit file to Temp Path
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                                tmp_file.write(uploaded_file.read())
-                                tmp_file_path = tmp_file.name
-
-                            # Run the Scanner
-                            # Pass the temp path and the db path
-                            scanner = ExactTeamScanner(self.db_path, tmp_file_path)
-                            # Connect logs
-                            scanner.set_callback(update_logs)
-                            
-                            team = scanner.scan()
-                            
-                            # Cleanup temp file immediately
-                            os.unlink(tmp_file_path)
-
-                            # Display Results
-                            if team[0] != []:
-                            
-                                export_data=scanner.export_json(team[0], team[1])
-                                st.json(export_data)
-                                
-                                # Download Button
-                                json_str = json.dumps(export_data, indent=4, ensure_ascii=False)
-                                st.download_button(
-                                    label=t["download_label"],
-                                    data=json_str,
-                                    file_name="team_export.json",
-                                    mime="application/json"
-                                )
-                            else:
-                                st.warning(t["no_players"])
-
-                        except Exception as e:
-                            st.error(f"An error occurred: {e}")
+                    # The scan runs on the shared executor, this script thread only polls it
+                    # Re-uploads of the same screenshot come straight from the cache
+                    try:
+                        job_id = get_executor().submit(self.db_path, uploaded_file.getvalue(), cache=get_result_cache())
+                        st.session_state["scan_job"] = (uploaded_file.file_id, job_id)
+                    except QueueFullError:
+                        st.warning(t["queue_full"])
+
+                # Only show the job of the screenshot that's currently uploaded
+                file_id, job_id = st.session_state.get("scan_job", (None, None))
+                if job_id is not None and file_id == uploaded_file.file_id:
+                    self.show_job(job_id, t)
 
         # TAB 2: INSTRUCTIONS
         with tab2:
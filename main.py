@@ -1,7 +1,6 @@
 from assets.package.website import WebsiteBuilder
-import assets.package.detector as detector
 
 # Just building the website
-detector.load_model()
+# (the OCR model is loaded by the first scan, not at startup)
 website=WebsiteBuilder()
 website.create_page()
\ No newline at end of file
@@ -0,0 +1,41 @@
+from assets.package.catalogue import PlayerRecord
+from assets.package.layout import TEAM_DOCK_16_9
+from assets.package.spatial import place_team
+
+FORMATION = 1  # 4-4-2 Box
+
+def make_team(template):
+    """ One player per slot, read exactly on it, plus a coach on the manager panel """
+    players = [PlayerRecord(index, f"Player {index}", f"Player {index}", role, None, None) for index, (role, _, _) in enumerate(template)]
+    positions = {player.id: (x, y) for player, (_, x, y) in zip(players, template)}
+    coach = PlayerRecord(100, "Coach", "Coach", None, None, None)
+    x0, y0, x1, y1 = TEAM_DOCK_16_9.region("manager").box
+    positions[coach.id] = ((x0 + x1) / 2, (y0 + y1) / 2)
+    return coach, players, positions
+
+def test_full_team_in_slot_order():
+    template = TEAM_DOCK_16_9.slots[FORMATION]
+    coach, players, positions = make_team(template)
+
+    found_coach, team, placed, _ = place_team([coach] + players[::-1], positions, TEAM_DOCK_16_9, FORMATION)
+
+    assert found_coach is coach
+    assert placed == 11
+    assert [player for _, player in team] == players
+    assert [role for role, _ in team] == [role for role, _, _ in template]
+
+def test_player_off_the_template_is_kept():
+    template = TEAM_DOCK_16_9.slots[FORMATION]
+    coach, players, positions = make_team(template)
+    # Read far from any slot (e.g. a misread box on the bench column)
+    stray = players[4]
+    positions[stray.id] = (0.97, 0.5)
+
+    found_coach, team, placed, _ = place_team([coach] + players, positions, TEAM_DOCK_16_9, FORMATION)
+
+    assert found_coach is coach
+    assert placed == 10
+    assert len(team) == 11
+    # Placed starters first, the stray one last without a role
+    assert team[-1] == (None, stray)
+    assert [player for _, player in team[:-1]] == players[:4] + players[5:]